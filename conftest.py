@@ -0,0 +1,14 @@
+import pytest
+
+from core.runner import temp_file_caches
+
+
+@pytest.fixture(autouse=True, scope='session')
+def temp_caches(tmp_path_factory):
+    ''' Файловые кэши тестов во временном каталоге, как у TempCacheRunner. '''
+    from django.test.utils import override_settings
+
+    with override_settings(
+        CACHES=temp_file_caches(tmp_path_factory.mktemp('cache'))
+    ):
+        yield
@@ -0,0 +1,92 @@
+import base64
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class PostApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        Post.objects.bulk_create([
+            Post(author=cls.user, group=cls.group, text=f'Пост {i}')
+            for i in range(15)
+        ])
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_endpoints_return_posts(self):
+        ''' index, group, profile отдают посты в JSON. '''
+        urls = (
+            reverse('api:index'),
+            reverse('api:group_list', args=[self.group.slug]),
+            reverse('api:profile', args=[self.user.username]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                data = response.json()
+                self.assertEqual(len(data['results']), 10)
+                self.assertEqual(data['results'][0]['author'], 'auth')
+
+    def test_sparse_fields(self):
+        ''' fields= ограничивает набор полей в ответе. '''
+        response = self.guest_client.get(
+            reverse('api:index'), {'fields': 'id,text'}
+        )
+        self.assertEqual(
+            set(response.json()['results'][0]), {'id', 'text'}
+        )
+        response = self.guest_client.get(
+            reverse('api:index'), {'fields': 'password'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_cursor_pagination(self):
+        ''' Курсор ведёт на следующую страницу без повторов. '''
+        first = self.guest_client.get(reverse('api:index')).json()
+        second = self.guest_client.get(
+            reverse('api:index'), {'cursor': first['next']}
+        ).json()
+        self.assertEqual(len(second['results']), 5)
+        self.assertIsNone(second['next'])
+        ids = [post['id'] for post in first['results'] + second['results']]
+        self.assertEqual(len(set(ids)), 15)
+
+    def test_etag_revalidation(self):
+        ''' Совпавший If-None-Match даёт 304 без тела. '''
+        response = self.guest_client.get(reverse('api:index'))
+        cached = self.guest_client.get(
+            reverse('api:index'), HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(cached.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(cached.content, b'')
+
+    def test_malformed_cursor(self):
+        ''' Кривой курсор — 400, а не 500. '''
+        cursors = ('не base64', 'bm90LWEtZGF0ZXwx') + tuple(
+            base64.urlsafe_b64encode(raw.encode()).decode()
+            for raw in ('вчера|1', '2020-01-01T00:00:00|x', '1|2|3')
+        )
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.guest_client.get(
+                    reverse('api:index'), {'cursor': cursor}
+                )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.BAD_REQUEST
+                )
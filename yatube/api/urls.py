@@ -0,0 +1,11 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', views.index, name='index'),
+    path('group/<slug:slug>/posts/', views.group_posts, name='group_list'),
+    path('profile/<str:username>/posts/', views.profile, name='profile'),
+]
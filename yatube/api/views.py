@@ -0,0 +1,154 @@
+import base64
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import quote_etag
+
+from posts.models import ArchivedPost, Group, Post, User
+from posts.views import PER_PAGE
+
+MAX_LIMIT = 100
+
+# Публичное имя поля -> колонка для values(). Модели не создаются,
+# связанные объекты подтягиваются JOIN-ом только для нужных колонок.
+FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def encode_cursor(row):
+    raw = f'{row["pub_date"].isoformat()}|{row["id"]}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        pub_date, pk = (
+            base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        )
+        pub_date, pk = parse_datetime(pub_date), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        raise BadRequest('Некорректный cursor')
+    if pub_date is None:
+        raise BadRequest('Некорректный cursor')
+    return pub_date, pk
+
+
+def requested_fields(request):
+    fields = request.GET.get('fields')
+    if not fields:
+        return tuple(FIELDS)
+    fields = tuple(name.strip() for name in fields.split(','))
+    unknown = set(fields) - set(FIELDS)
+    if unknown:
+        raise BadRequest(f'Неизвестные поля: {", ".join(sorted(unknown))}')
+    return fields
+
+
+def requested_limit(request):
+    try:
+        limit = int(request.GET.get('limit', PER_PAGE))
+    except ValueError:
+        raise BadRequest('Некорректный limit')
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def serialize(row, fields):
+    item = {name: row[FIELDS[name]] for name in fields}
+    if 'pub_date' in item:
+        item['pub_date'] = item['pub_date'].isoformat()
+    if item.get('image'):
+        item['image'] = settings.MEDIA_URL + item['image']
+    elif 'image' in item:
+        item['image'] = None
+    return item
+
+
+def post_page(request, posts, archived):
+    ''' Страница проекции постов с курсором на следующую.
+
+    Архив старше горячей таблицы, поэтому его строки просто дописываются
+    после горячих, когда те кончились: курсор общий для обеих.
+    '''
+    fields = requested_fields(request)
+    limit = requested_limit(request)
+    cursor = request.GET.get('cursor')
+    after = Q()
+    if cursor:
+        pub_date, pk = decode_cursor(cursor)
+        after = Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk)
+    columns = {'id', 'pub_date'} | {FIELDS[name] for name in fields}
+    rows = []
+    for queryset in (posts, archived):
+        rows += queryset.filter(after).order_by('-pub_date', '-id').values(
+            *columns
+        )[:limit + 1 - len(rows)]
+        if len(rows) > limit:
+            break
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return {
+        'results': [serialize(row, fields) for row in rows[:limit]],
+        'next': next_cursor,
+    }
+
+
+def json_view(view):
+    ''' Отдаёт словарь как JSON с ETag и ответом 304 на If-None-Match. '''
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            data = view(request, *args, **kwargs)
+        except BadRequest as error:
+            return JsonResponse({'error': str(error)}, status=400)
+        response = JsonResponse(data, json_dumps_params={
+            'ensure_ascii': False
+        })
+        etag = quote_etag(hashlib.md5(response.content).hexdigest())
+        response['ETag'] = etag
+        return get_conditional_response(
+            request, etag=etag, response=response
+        )
+    return wrapper
+
+
+@json_view
+def index(request):
+    ''' Лента последних постов. '''
+    return post_page(request, Post.objects.all(), ArchivedPost.objects.all())
+
+
+@json_view
+def group_posts(request, slug):
+    ''' Посты группы. '''
+    group = get_object_or_404(Group.objects.only('id'), slug=slug)
+    return post_page(
+        request,
+        Post.objects.filter(group=group),
+        ArchivedPost.objects.filter(group=group),
+    )
+
+
+@json_view
+def profile(request, username):
+    ''' Посты автора. '''
+    author = get_object_or_404(User.objects.only('id'), username=username)
+    return post_page(
+        request,
+        Post.objects.filter(author=author),
+        ArchivedPost.objects.filter(author=author),
+    )
@@ -1,5 +1,12 @@
 from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import checks, db  # noqa: F401
+
+        # Задачи приложений регистрируются при импорте их tasks.py.
+        autodiscover_modules('tasks')
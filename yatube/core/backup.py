@@ -0,0 +1,72 @@
+import gzip
+import os
+import shutil
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .db import copy_database
+
+
+def snapshot_name(alias, compress):
+    stamp = timezone.now().strftime('%Y%m%d-%H%M%S')
+    suffix = '.sqlite3.gz' if compress else '.sqlite3'
+    return f'{alias}-{stamp}{suffix}'
+
+
+def compress_file(source, target):
+    with open(source, 'rb') as src:
+        with gzip.open(
+            target, 'wb', compresslevel=settings.BACKUP_COMPRESSLEVEL
+        ) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+
+
+def backup_database(alias, directory, pages=None, sleep=None,
+                    compress=True, progress=None):
+    ''' Снимок базы alias в directory, возвращает путь к файлу.
+
+    Копирование идёт через backup API по pages страниц с паузой sleep,
+    поэтому писатели ждут не дольше одного шага. Сжатие выполняется
+    уже по готовой копии и базу не держит. Файл появляется под своим
+    именем только целиком.
+
+    Запись в базу между шагами заставляет SQLite начать копирование
+    заново, поэтому для большой и часто пишущейся базы шаг стоит
+    увеличить: в режиме WAL шаг держит только снимок для чтения.
+    После DB_COPY_MAX_RESTARTS перезапусков copy_database копирует
+    базу одним шагом. Если копия не удалась, sqlite3.Error пробрасывается,
+    а недописанный файл удаляется.
+    '''
+    pages = pages or settings.BACKUP_PAGES
+    sleep = settings.BACKUP_SLEEP if sleep is None else sleep
+    os.makedirs(directory, exist_ok=True)
+    target = os.path.join(directory, snapshot_name(alias, compress))
+    copy = target + '.part'
+    source = connections[alias].settings_dict['NAME']
+    try:
+        copy_database(source, copy, pages, sleep, progress)
+        if compress:
+            compress_file(copy, copy + '.gz')
+            os.remove(copy)
+            copy += '.gz'
+        os.replace(copy, target)
+    finally:
+        for leftover in (copy, copy + '.gz'):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    return target
+
+
+def rotate_backups(alias, directory, keep):
+    ''' Оставляет keep последних снимков alias, возвращает удалённые. '''
+    snapshots = sorted(
+        name for name in os.listdir(directory)
+        if name.startswith(f'{alias}-')
+        and name.endswith(('.sqlite3', '.sqlite3.gz'))
+    )
+    removed = snapshots[:max(len(snapshots) - keep, 0)]
+    for name in removed:
+        os.remove(os.path.join(directory, name))
+    return removed
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, register
+
+
+@register()
+def session_cache_is_shared(app_configs, **kwargs):
+    ''' Кэш сессий в памяти процесса не видит выхода из аккаунта в другом
+    воркере: там сессия оставалась бы живой до SESSION_CACHE_TIMEOUT. '''
+    if settings.SESSION_ENGINE != 'core.sessions':
+        return []
+    if isinstance(caches[settings.SESSION_CACHE_ALIAS], LocMemCache):
+        return [Error(
+            f'SESSION_CACHE_ALIAS={settings.SESSION_CACHE_ALIAS!r} '
+            'указывает на LocMemCache.',
+            hint='Нужен общий для воркеров кэш: файловый, memcached, '
+                 'база данных.',
+            id='core.E001',
+        )]
+    return []
@@ -0,0 +1,73 @@
+import logging
+import sqlite3
+from contextlib import closing
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+
+def pragma_statements(pragmas):
+    return [f'PRAGMA {name} = {value}' for name, value in pragmas.items()]
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    ''' Настраивает каждое новое соединение SQLite из SQLITE_PRAGMAS.
+
+    Для отдельной базы набор можно переопределить ключом PRAGMAS
+    в её записи DATABASES.
+    '''
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = connection.settings_dict.get('PRAGMAS', settings.SQLITE_PRAGMAS)
+    for statement in pragma_statements(pragmas):
+        connection.connection.execute(statement)
+
+
+class CopyRestarted(Exception):
+    ''' Запись в источник слишком часто перезапускала копирование. '''
+
+
+def copy_database(source, target, pages=-1, sleep=0.25, progress=None,
+                  restarts=None):
+    ''' Копирует файл SQLite source в target через online backup API.
+
+    Копия идёт порциями по pages страниц с паузой sleep между ними,
+    так что запись в source не блокируется на всё время копирования,
+    а читатели target видят либо старую, либо новую версию целиком.
+
+    Каждая запись в source между порциями начинает копирование заново,
+    и на занятой базе оно не закончилось бы никогда. Поэтому после
+    restarts перезапусков (DB_COPY_MAX_RESTARTS) база копируется одним
+    шагом: в режиме WAL он держит лишь снимок для чтения, в прочих
+    режимах писатели ждут до конца копии. Возвращает число перезапусков,
+    ошибки SQLite пробрасываются вызывающему.
+    '''
+    if restarts is None:
+        restarts = settings.DB_COPY_MAX_RESTARTS
+    seen = {'remaining': None, 'restarts': 0}
+
+    def watch(status, remaining, total):
+        # После перезапуска непереписанных страниц снова становится больше.
+        if seen['remaining'] is not None and remaining > seen['remaining']:
+            seen['restarts'] += 1
+            if seen['restarts'] > restarts:
+                raise CopyRestarted
+        seen['remaining'] = remaining
+        if progress:
+            progress(status, remaining, total)
+
+    with closing(sqlite3.connect(source)) as src:
+        with closing(sqlite3.connect(target)) as dst:
+            try:
+                src.backup(dst, pages=pages, sleep=sleep, progress=watch)
+            except CopyRestarted:
+                logger.warning(
+                    'Копирование %s перезапускалось %d раз, копируем '
+                    'одним шагом', source, restarts,
+                )
+                src.backup(dst, pages=-1, progress=progress)
+    return seen['restarts']
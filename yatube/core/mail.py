@@ -0,0 +1,101 @@
+import json
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxBackend(BaseEmailBackend):
+    ''' Почтовый бэкенд, который только складывает письма в outbox.
+
+    Запрос платит за один INSERT; доставкой занимается flush_outbox
+    через настоящий бэкенд из OUTBOX_EMAIL_BACKEND.
+    '''
+
+    def send_messages(self, email_messages):
+        rows = [self.to_row(message) for message in email_messages]
+        OutboxMessage.objects.bulk_create(rows)
+        return len(rows)
+
+    @staticmethod
+    def to_row(message):
+        html_body = ''
+        for content, mimetype in getattr(message, 'alternatives', ()):
+            if mimetype == 'text/html':
+                html_body = content
+        return OutboxMessage(
+            subject=message.subject,
+            body=message.body,
+            html_body=html_body,
+            from_email=message.from_email,
+            recipients=json.dumps(message.recipients()),
+        )
+
+
+def to_email(row):
+    message = EmailMultiAlternatives(
+        row.subject, row.body, row.from_email, json.loads(row.recipients)
+    )
+    if row.html_body:
+        message.attach_alternative(row.html_body, 'text/html')
+    return message
+
+
+def retry_delay(attempts):
+    delay = settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.TASKS_RETRY_MAX_DELAY))
+
+
+def flush_outbox(batch_size=None, rate=None):
+    ''' Отправляет пачку писем через одно соединение бэкенда.
+
+    Между письмами держится пауза, чтобы не превышать rate писем
+    в секунду. Возвращает пару (отправлено, с ошибкой).
+    '''
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    rate = rate or settings.OUTBOX_RATE
+    rows = list(OutboxMessage.objects.filter(
+        status=OutboxMessage.PENDING, next_attempt__lte=timezone.now()
+    ).order_by('next_attempt')[:batch_size])
+    if not rows:
+        return 0, 0
+    sent_ids = []
+    failed = 0
+    interval = 1 / rate if rate else 0
+    with get_connection(settings.OUTBOX_EMAIL_BACKEND) as connection:
+        for row in rows:
+            started = time.monotonic()
+            try:
+                connection.send_messages([to_email(row)])
+            except Exception as error:
+                logger.exception('Письмо %s не отправлено', row.pk)
+                failed += 1
+                attempts = row.attempts + 1
+                OutboxMessage.objects.filter(pk=row.pk).update(
+                    attempts=F('attempts') + 1,
+                    last_error=str(error),
+                    next_attempt=timezone.now() + retry_delay(attempts),
+                    status=(
+                        OutboxMessage.FAILED
+                        if attempts >= settings.OUTBOX_MAX_ATTEMPTS
+                        else OutboxMessage.PENDING
+                    ),
+                )
+            else:
+                sent_ids.append(row.pk)
+            pause = interval - (time.monotonic() - started)
+            if pause > 0:
+                time.sleep(pause)
+    OutboxMessage.objects.filter(pk__in=sent_ids).update(
+        status=OutboxMessage.SENT, sent=timezone.now()
+    )
+    return len(sent_ids), failed
@@ -0,0 +1,58 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.backup import backup_database, rotate_backups
+
+
+class Command(BaseCommand):
+    help = (
+        'Снимок базы SQLite на ходу через backup API: маленькими шагами '
+        'с паузами, со сжатием и ротацией старых снимков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--output-dir', default=settings.BACKUP_DIR)
+        parser.add_argument(
+            '--pages', type=int, default=settings.BACKUP_PAGES,
+            help='Страниц за один шаг копирования.',
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=settings.BACKUP_SLEEP,
+            help='Пауза между шагами, секунд.',
+        )
+        parser.add_argument(
+            '--no-compress', action='store_false', dest='compress',
+        )
+        parser.add_argument(
+            '--keep', type=int, default=settings.BACKUP_KEEP,
+            help='Сколько последних снимков хранить; 0 — не удалять.',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            path = backup_database(
+                options['database'],
+                options['output_dir'],
+                options['pages'],
+                options['sleep'],
+                options['compress'],
+                progress=self.progress if options['verbosity'] > 1 else None,
+            )
+        except sqlite3.Error as error:
+            raise CommandError(f'Снимок не удался: {error}')
+        self.stdout.write(
+            f'Снимок {path} готов за {time.monotonic() - started:.1f} с'
+        )
+        if options['keep']:
+            for name in rotate_backups(
+                options['database'], options['output_dir'], options['keep']
+            ):
+                self.stdout.write(f'Удалён старый снимок {name}')
+
+    def progress(self, status, remaining, total):
+        self.stdout.write(f'Скопировано {total - remaining} из {total}')
@@ -0,0 +1,121 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db import pragma_statements
+
+SCHEMA = (
+    'CREATE TABLE post ('
+    'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+    'author_id INTEGER NOT NULL, '
+    'text TEXT NOT NULL)',
+    'CREATE INDEX post_author ON post (author_id)',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite со стандартными PRAGMA '
+        'и с SQLITE_PRAGMAS на смешанной нагрузке чтения и записи.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument(
+            '--writes', type=float, default=0.2,
+            help='Доля операций записи.',
+        )
+        parser.add_argument('--rows', type=int, default=20000)
+        parser.add_argument(
+            '--timeout', type=float, default=1.0,
+            help='Таймаут ожидания блокировки соединения, секунд.',
+        )
+
+    def handle(self, *args, **options):
+        profiles = (
+            ('по умолчанию', {}),
+            ('SQLITE_PRAGMAS', settings.SQLITE_PRAGMAS),
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for label, pragmas in profiles:
+                path = os.path.join(directory, f'{len(pragmas)}.sqlite3')
+                self.seed(path, pragmas, options['rows'])
+                ops, errors = self.run(path, pragmas, options)
+                self.stdout.write(
+                    f'{label:>15}: {ops / options["seconds"]:9.0f} оп/с, '
+                    f'ошибок блокировки: {errors}'
+                )
+
+    def connect(self, path, pragmas, timeout):
+        db = sqlite3.connect(
+            path, timeout=timeout, isolation_level=None,
+            check_same_thread=False,
+        )
+        for statement in pragma_statements(pragmas):
+            db.execute(statement)
+        return db
+
+    def seed(self, path, pragmas, rows):
+        db = self.connect(path, pragmas, 5.0)
+        for statement in SCHEMA:
+            db.execute(statement)
+        db.execute('BEGIN')
+        db.executemany(
+            'INSERT INTO post (author_id, text) VALUES (?, ?)',
+            ((i % 100, f'Пост {i}' * 10) for i in range(rows)),
+        )
+        db.execute('COMMIT')
+        db.close()
+
+    def run(self, path, pragmas, options):
+        deadline = time.monotonic() + options['seconds']
+        counters = {'ops': 0, 'errors': 0}
+        lock = threading.Lock()
+
+        def worker():
+            db = self.connect(path, pragmas, options['timeout'])
+            rng = random.Random()
+            ops = errors = 0
+            while time.monotonic() < deadline:
+                author = rng.randrange(100)
+                try:
+                    if rng.random() < options['writes']:
+                        db.execute('BEGIN IMMEDIATE')
+                        db.execute(
+                            'INSERT INTO post (author_id, text) '
+                            'VALUES (?, ?)',
+                            (author, 'Новый пост' * 10),
+                        )
+                        db.execute('COMMIT')
+                    else:
+                        db.execute(
+                            'SELECT id, text FROM post WHERE author_id = ? '
+                            'ORDER BY id DESC LIMIT 10',
+                            (author,),
+                        ).fetchall()
+                    ops += 1
+                except sqlite3.OperationalError:
+                    errors += 1
+                    if db.in_transaction:
+                        db.execute('ROLLBACK')
+            db.close()
+            with lock:
+                counters['ops'] += ops
+                counters['errors'] += errors
+
+        threads = [
+            threading.Thread(target=worker)
+            for _ in range(options['threads'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return counters['ops'], counters['errors']
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.mail import flush_outbox
+
+
+class Command(BaseCommand):
+    help = (
+        'Отправляет письма из outbox пачками через одно соединение. '
+        'Запускайте один экземпляр команды.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument(
+            '--rate', type=float, help='Не больше писем в секунду.'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не выходить, а опрашивать outbox каждые --poll секунд.',
+        )
+        parser.add_argument('--poll', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = flush_outbox(options['batch_size'], options['rate'])
+            if sent or failed:
+                self.stdout.write(f'Отправлено: {sent}, с ошибкой: {failed}')
+            if not options['loop']:
+                break
+            if not sent and not failed:
+                time.sleep(options['poll'])
@@ -0,0 +1,53 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.db import copy_database
+
+
+class Command(BaseCommand):
+    help = (
+        'Обновляет реплику REPLICA_DATABASE копией основной базы SQLite. '
+        'Локальная замена настоящей репликации.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', type=int, default=settings.REPLICA_COPY_PAGES,
+            help='Страниц за один шаг копирования.',
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=settings.REPLICA_COPY_SLEEP,
+            help='Пауза между шагами, секунд.',
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не выходить, а обновлять каждые --interval секунд.',
+        )
+        parser.add_argument(
+            '--interval', type=float,
+            default=settings.REPLICA_REFRESH_INTERVAL,
+        )
+
+    def handle(self, *args, **options):
+        source = connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+        target = connections[settings.REPLICA_DATABASE].settings_dict['NAME']
+        if source == target:
+            raise CommandError('Реплика указывает на основную базу.')
+        while True:
+            started = time.monotonic()
+            try:
+                copy_database(
+                    source, target, options['pages'], options['sleep']
+                )
+            except sqlite3.Error as error:
+                raise CommandError(f'Реплика не обновлена: {error}')
+            self.stdout.write(
+                f'Реплика обновлена за {time.monotonic() - started:.2f} с'
+            )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,60 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from core.queue import claim, run_task
+
+
+def work(pk):
+    ''' Выполняет задачу в потоке пула и освобождает его соединение. '''
+    try:
+        return run_task(pk)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди пулом потоков или процессов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument(
+            '--processes', action='store_true',
+            help='Пул процессов вместо пула потоков.',
+        )
+        parser.add_argument(
+            '--poll', type=float, default=1.0,
+            help='Пауза между опросами пустой очереди, секунд.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти.',
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        processes = options['processes']
+        if processes:
+            pool = ProcessPoolExecutor(max_workers=workers)
+        else:
+            pool = ThreadPoolExecutor(max_workers=workers)
+        done = failed = 0
+        with pool:
+            while True:
+                ids = claim(workers * 2)
+                if not ids:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll'])
+                    continue
+                if processes:
+                    # Пул запускает процессы лениво, при первой задаче, а
+                    # claim() уже открыл соединение: дочерние процессы не
+                    # должны его унаследовать.
+                    connections.close_all()
+                for ok in pool.map(work, ids):
+                    done += ok
+                    failed += not ok
+                self.stdout.write(f'Выполнено: {done}, с ошибкой: {failed}')
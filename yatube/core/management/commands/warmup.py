@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from core.warmup import import_costs, warmup
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогревает воркер: шаблоны, URL, тяжёлые модули и кэши страниц. '
+        'С --imports показывает самые дорогие импорты при старте.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--no-pages', action='store_true',
+            help='Не прогонять страницы из WARMUP_URLS.',
+        )
+        parser.add_argument(
+            '--imports', type=int, metavar='N', default=0,
+            help='Показать N самых дорогих импортов при загрузке WSGI.',
+        )
+
+    def handle(self, *args, **options):
+        report = warmup(prime=not options['no_pages'])
+        for module, seconds in report['imports']:
+            self.stdout.write(f'import {module}: {seconds * 1000:.1f} мс')
+        self.stdout.write(f'Шаблонов скомпилировано: {report["templates"]}')
+        self.stdout.write(f'Имён URL: {report["urls"]}')
+        for path, status in report.get('pages', {}).items():
+            self.stdout.write(f'GET {path}: {status}')
+        if options['imports']:
+            self.stdout.write('Импорты при старте (накопленное время):')
+            for module, own, cumulative in import_costs(options['imports']):
+                self.stdout.write(
+                    f'{cumulative / 1000:8.1f} мс {own / 1000:8.1f} мс  '
+                    f'{module}'
+                )
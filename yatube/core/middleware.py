@@ -0,0 +1,88 @@
+import math
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.shortcuts import render
+
+from .ratelimit import check
+from .routers import read_from_replica
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class ReplicaMiddleware:
+    ''' Читает страницы из REPLICA_VIEWS с реплики.
+
+    После любого изменяющего запроса и после REPLICA_PIN_VIEWS клиент
+    получает куку REPLICA_PIN_COOKIE и ещё REPLICA_PIN_SECONDS читает
+    только из primary, чтобы автор сразу видел свой новый пост.
+    Пользователь запроса и дыры страницы всегда читаются из primary.
+    '''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        if (
+            request.method not in SAFE_METHODS
+            or match and match.view_name in settings.REPLICA_PIN_VIEWS
+        ):
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE,
+                '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            request.method not in ('GET', 'HEAD')
+            or settings.REPLICA_PIN_COOKIE in request.COOKIES
+            or request.resolver_match.view_name not in settings.REPLICA_VIEWS
+        ):
+            return None
+        if hasattr(request, 'user'):
+            # Ленивый request.user загружается до входа на реплику.
+            request.user.is_authenticated
+        with read_from_replica():
+            return view_func(request, *view_args, **view_kwargs)
+
+
+class RateLimitMiddleware:
+    ''' Ограничивает частоту запросов к представлениям из RATELIMITS.
+
+    Проверка идёт в process_view, до представления: отклонённый запрос
+    не пишет в базу и не ждёт блокировку SQLite. Ответ — 429 с
+    заголовком Retry-After, для JSON-запросов тело тоже в JSON.
+    '''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        limited = check(request, request.resolver_match.view_name)
+        if limited is None:
+            return None
+        retry_after = math.ceil(limited[1])
+        if request.content_type == 'application/json':
+            response = JsonResponse(
+                {'error': 'Слишком много запросов',
+                 'retry_after': retry_after},
+                status=429,
+            )
+        else:
+            response = render(
+                request,
+                'core/429.html',
+                {'retry_after': retry_after},
+                status=429,
+            )
+        response['Retry-After'] = str(retry_after)
+        return response
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import re
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from .routers import read_from_primary
+
+HOLES = {}
+HOLE_RE = re.compile(r'<!--hole (\[.*?\])-->')
+PAGE_KEY = 'pagecache:{}:{}:{}'
+TAG_KEY = 'pagecache:tag:{}'
+
+
+def register_hole(name):
+    ''' Регистрирует функцию(request, *args) -> HTML для {% hole name %}. '''
+    def register(func):
+        HOLES[name] = func
+        return func
+    return register
+
+
+def render_hole(request, name, *args):
+    ''' Дыры личные и должны быть свежими, поэтому читают из primary. '''
+    with read_from_primary():
+        return HOLES[name](request, *args)
+
+
+def hole_marker(name, args):
+    ''' Метка на месте дыры. Аргументы — JSON; '>' экранируется, чтобы
+    метка не закрылась раньше времени. '''
+    payload = json.dumps([name, *args]).replace('>', '\\u003e')
+    return f'<!--hole {payload}-->'
+
+
+def fill_holes(request, content):
+    return HOLE_RE.sub(
+        lambda match: render_hole(request, *json.loads(match.group(1))),
+        content,
+    )
+
+
+def page_cache():
+    return caches[settings.PAGE_CACHE_ALIAS]
+
+
+def tag_versions(tags):
+    ''' Текущие версии тегов. Новый тег получает версию по времени,
+    чтобы не совпасть со страницами, сохранёнными до его вытеснения. '''
+    cache = page_cache()
+    keys = [TAG_KEY.format(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    missing = dict.fromkeys(
+        (key for key in keys if key not in versions), time.time_ns()
+    )
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_tags(tags):
+    ''' Сбрасывает все страницы с этими тегами. '''
+    cache = page_cache()
+    for tag in tags:
+        try:
+            cache.incr(TAG_KEY.format(tag))
+        except ValueError:
+            pass
+
+
+def shared_cache_page(timeout, key_prefix, tags=None):
+    ''' Кэш страницы, общий для анонимов и вошедших пользователей.
+
+    В отличие от cache_page ключ не зависит от куки: в кэш попадает
+    страница с метками {% hole %} вместо личных кусков (шапка, кнопка
+    подписки), а метки заполняются на каждый запрос.
+    tags(**kwargs) возвращает теги страницы; bump_tags сбрасывает их
+    раньше timeout. POST-форм на таких страницах нет: {% csrf_token %}
+    попал бы в общий кэш.
+
+    Запрос с REPLICA_PIN_COOKIE кэш не читает: ReplicaMiddleware
+    рендерит его из primary, и свежая страница заменяет в кэше копию,
+    которую мог сохранить запрос к отстающей реплике.
+    '''
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            versions = tag_versions(tags(**kwargs)) if tags else []
+            key = PAGE_KEY.format(
+                key_prefix,
+                hashlib.md5(request.get_full_path().encode()).hexdigest(),
+                '.'.join(map(str, versions)),
+            )
+            cache = page_cache()
+            pinned = settings.REPLICA_PIN_COOKIE in request.COOKIES
+            content = None if pinned else cache.get(key)
+            if content is None:
+                request.punch_holes = True
+                try:
+                    response = view(request, *args, **kwargs)
+                finally:
+                    request.punch_holes = False
+                if response.streaming:
+                    return response
+                content = response.content.decode(response.charset)
+                if response.status_code == 200:
+                    cache.set(key, content, timeout)
+            else:
+                response = HttpResponse()
+            response.content = fill_holes(request, content)
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
+
+
+def cache_policy(max_age, keys=None):
+    ''' Заголовки для CDN и обратного прокси.
+
+    Ответ анониму на GET — public с max-age для браузера и
+    s-maxage=CACHE_SURROGATE_MAX_AGE для прокси, плюс Surrogate-Key
+    из keys(**kwargs): по ним core.purge сбрасывает страницу при
+    изменениях. Ответы вошедшим пользователям — private.
+    '''
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            if (
+                request.method not in ('GET', 'HEAD')
+                or response.status_code != 200
+            ):
+                return response
+            if request.session.get(SESSION_KEY):
+                patch_cache_control(response, private=True)
+                return response
+            patch_cache_control(
+                response,
+                public=True,
+                max_age=max_age,
+                s_maxage=settings.CACHE_SURROGATE_MAX_AGE,
+            )
+            if keys:
+                response['Surrogate-Key'] = ' '.join(keys(**kwargs))
+            return response
+        return wrapper
+    return decorator
+
+
+@register_hole('header')
+def header(request, post=None):
+    return render_to_string(
+        'includes/header.html', {'post': post or None}, request
+    )
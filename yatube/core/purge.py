@@ -0,0 +1,95 @@
+import logging
+import queue
+import threading
+import urllib.request
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+class PurgeDispatcher:
+    ''' Рассылает PURGE/BAN по суррогатным ключам на CACHE_PURGE_URLS.
+
+    Запросы уходят из фонового потока, чтобы медленный прокси не
+    задерживал ответ. Всё, что накопилось в очереди, объединяется
+    в один запрос на каждый прокси.
+    '''
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def submit(self, keys):
+        self.queue.put(set(keys))
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name='cache-purge', daemon=True
+                )
+                self.thread.start()
+
+    def take_keys(self):
+        batches = [self.queue.get()]
+        while True:
+            try:
+                batches.append(self.queue.get_nowait())
+            except queue.Empty:
+                return batches
+
+    def run(self):
+        while True:
+            batches = self.take_keys()
+            try:
+                self.send(set().union(*batches))
+            finally:
+                for _ in batches:
+                    self.queue.task_done()
+
+    def send(self, keys):
+        header = ' '.join(sorted(keys))
+        for url in settings.CACHE_PURGE_URLS:
+            request = urllib.request.Request(
+                url,
+                method=settings.CACHE_PURGE_METHOD,
+                headers={settings.CACHE_PURGE_HEADER: header},
+            )
+            try:
+                urllib.request.urlopen(
+                    request, timeout=settings.CACHE_PURGE_TIMEOUT
+                ).close()
+            except OSError:
+                logger.warning(
+                    'Не удалось сбросить %s на %s', header, url, exc_info=True
+                )
+
+    def wait(self):
+        ''' Ждёт, пока очередь разошлётся (для тестов и команд). '''
+        self.queue.join()
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = PurgeDispatcher()
+        return _dispatcher
+
+
+def purge_enabled():
+    return bool(settings.CACHE_PURGE_URLS)
+
+
+def purge(keys):
+    ''' Сбрасывает ключи на прокси после COMMIT текущей транзакции;
+    при откате ничего не уходит. '''
+    keys = set(keys)
+    if not keys or not purge_enabled():
+        return
+    transaction.on_commit(lambda: get_dispatcher().submit(keys))
@@ -0,0 +1,121 @@
+import json
+import logging
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+REGISTRY = {}
+
+
+def task(func=None, *, name=None, max_attempts=None):
+    ''' Регистрирует функцию как фоновую задачу.
+
+    У функции появляется метод delay(*args, **kwargs), который ставит
+    вызов в очередь. Аргументы должны сериализоваться в JSON.
+    '''
+    def register(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        func.task_name = task_name
+        func.max_attempts = max_attempts or settings.TASKS_MAX_ATTEMPTS
+        func.delay = lambda *args, **kwargs: enqueue(func, *args, **kwargs)
+        REGISTRY[task_name] = func
+        return func
+    return register(func) if func else register
+
+
+def enqueue(func, *args, run_at=None, **kwargs):
+    ''' Ставит задачу в очередь; в режиме TASKS_EAGER выполняет сразу. '''
+    if settings.TASKS_EAGER:
+        return func(*args, **kwargs)
+    return Task.objects.create(
+        name=func.task_name,
+        payload=json.dumps({'args': args, 'kwargs': kwargs}),
+        run_at=run_at or timezone.now(),
+    )
+
+
+def backoff(attempts):
+    ''' Экспоненциальная задержка перед очередной попыткой. '''
+    delay = settings.TASKS_RETRY_DELAY * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.TASKS_RETRY_MAX_DELAY))
+
+
+def claimable(now):
+    ''' Готовые задачи и задачи с истёкшей арендой упавших воркеров. '''
+    lease = timedelta(seconds=settings.TASKS_LEASE)
+    return (
+        Q(status=Task.QUEUED, run_at__lte=now)
+        | Q(status=Task.RUNNING, claimed_at__lt=now - lease)
+    )
+
+
+def claim(limit):
+    ''' Забирает до limit готовых задач и возвращает их id.
+
+    Захват — один UPDATE с меткой воркера, так что две копии run_workers
+    не получат одну и ту же задачу. Задача арендуется на TASKS_LEASE
+    секунд: если воркер умер посреди неё, задачу заберёт следующий claim.
+    '''
+    now = timezone.now()
+    due = Task.objects.filter(claimable(now)).order_by(
+        'run_at'
+    ).values_list('pk', flat=True)[:limit]
+    token = uuid.uuid4().hex
+    Task.objects.filter(claimable(now), pk__in=list(due)).update(
+        status=Task.RUNNING, worker=token, claimed_at=now,
+        attempts=F('attempts') + 1,
+    )
+    return list(Task.objects.filter(worker=token).values_list('pk', flat=True))
+
+
+def run_task(pk):
+    ''' Выполняет захваченную задачу: удаляет при успехе, иначе планирует
+    повтор с backoff или помечает как упавшую. '''
+    job = Task.objects.get(pk=pk)
+    func = REGISTRY.get(job.name)
+    if func is None:
+        job.status = Task.FAILED
+        job.last_error = f'Неизвестная задача {job.name}'
+        job.save(update_fields=('status', 'last_error'))
+        return False
+    if job.attempts > func.max_attempts:
+        # Сюда попадают только задачи, чьи воркеры умирали на каждой
+        # попытке: выполнять их ещё раз незачем.
+        job.status = Task.FAILED
+        job.last_error = 'Аренда истекла на последней попытке'
+        job.save(update_fields=('status', 'last_error'))
+        return False
+    payload = json.loads(job.payload)
+    try:
+        func(*payload['args'], **payload['kwargs'])
+    except Exception:
+        logger.exception('Задача %s упала', job.name)
+        job.last_error = traceback.format_exc()
+        if job.attempts < func.max_attempts:
+            job.status = Task.QUEUED
+            job.run_at = timezone.now() + backoff(job.attempts)
+        else:
+            job.status = Task.FAILED
+        job.worker = ''
+        job.save(update_fields=(
+            'status', 'run_at', 'worker', 'last_error'
+        ))
+        return False
+    job.delete()
+    return True
+
+
+def run_pending(limit=100):
+    ''' Синхронно выполняет готовые задачи, возвращает их число. '''
+    ids = claim(limit)
+    for pk in ids:
+        run_task(pk)
+    return len(ids)
@@ -0,0 +1,147 @@
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+logger = logging.getLogger(__name__)
+
+BUCKET_KEY = 'ratelimit:{}:{}:{}'
+COUNTER_KEY = 'ratelimit:count:{}:{}'
+OUTCOMES = ('allowed', 'user', 'ip')
+
+# Запасное хранилище в памяти процесса: лимиты продолжают работать,
+# даже если RATELIMIT_CACHE не настроен или недоступен.
+fallback = LocMemCache('ratelimit', {'MAX_ENTRIES': 10000})
+
+
+def stores():
+    try:
+        yield caches[settings.RATELIMIT_CACHE]
+    except InvalidCacheBackendError:
+        pass
+    yield fallback
+
+
+def with_store(operation):
+    ''' Выполняет operation(cache) в RATELIMIT_CACHE, при ошибке —
+    в памяти процесса. '''
+    for store in stores():
+        try:
+            return operation(store)
+        except Exception:
+            if store is fallback:
+                raise
+            logger.warning(
+                'Кэш %s недоступен, лимиты в памяти процесса',
+                settings.RATELIMIT_CACHE, exc_info=True,
+            )
+
+
+def take_token(key, capacity, period, now=None):
+    ''' Берёт жетон из ведра на capacity жетонов, которое наполняется
+    целиком за period секунд. Возвращает 0, если жетон взят, иначе
+    сколько секунд ждать следующего.
+
+    Чтение и запись ведра не атомарны, так что при гонке параллельных
+    запросов лимит может пропустить лишний запрос — для защиты от
+    всплесков этого достаточно.
+    '''
+    now = time.time() if now is None else now
+    rate = capacity / period
+
+    def take(store):
+        tokens, stamp = store.get(key) or (capacity, now)
+        tokens = min(capacity, tokens + (now - stamp) * rate)
+        if tokens < 1:
+            return (1 - tokens) / rate
+        store.set(key, (tokens - 1, now), math.ceil(period))
+        return 0
+
+    return with_store(take)
+
+
+def count(view_name, outcome):
+    key = COUNTER_KEY.format(view_name, outcome)
+
+    def bump(store):
+        if not store.add(key, 1, None):
+            store.incr(key)
+
+    with_store(bump)
+
+
+def counters():
+    ''' Счётчики для мониторинга: {имя URL: {исход: число}}, где исход —
+    allowed или ведро (user, ip), которое отклонило запрос. '''
+    keys = {
+        COUNTER_KEY.format(name, outcome): (name, outcome)
+        for name in settings.RATELIMITS
+        for outcome in OUTCOMES
+    }
+    values = with_store(lambda store: store.get_many(list(keys)))
+    result = {name: dict.fromkeys(OUTCOMES, 0) for name in settings.RATELIMITS}
+    for key, value in values.items():
+        name, outcome = keys[key]
+        result[name][outcome] = value
+    return result
+
+
+def client_ip(request):
+    ''' Адрес клиента с учётом RATELIMIT_PROXY_COUNT доверенных прокси.
+
+    Каждый прокси дописывает в RATELIMIT_PROXY_HEADER адрес, с которого
+    к нему пришли, поэтому клиент — RATELIMIT_PROXY_COUNT-й адрес с конца.
+    Всё левее мог подставить сам клиент. Если адресов меньше, запрос
+    пришёл в обход прокси, и верить можно только REMOTE_ADDR.
+    '''
+    remote = request.META.get('REMOTE_ADDR', '')
+    count = settings.RATELIMIT_PROXY_COUNT
+    if not settings.RATELIMIT_PROXY_HEADER or not count:
+        return remote
+    forwarded = [
+        address.strip() for address in request.META.get(
+            settings.RATELIMIT_PROXY_HEADER, ''
+        ).split(',') if address.strip()
+    ]
+    if len(forwarded) < count:
+        return remote
+    return forwarded[-count]
+
+
+def buckets(request, rule):
+    ''' Вёдра запроса: пользователь берётся из сессии, без обращения
+    к таблице пользователей. '''
+    user_id = getattr(request, 'session', {}).get(SESSION_KEY)
+    if user_id and 'user' in rule:
+        yield 'user', user_id, rule['user']
+    if 'ip' in rule:
+        yield 'ip', client_ip(request), rule['ip']
+
+
+def check(request, view_name):
+    ''' Проверяет лимиты RATELIMITS[view_name]. Возвращает None, если
+    запрос пропущен, иначе (ведро, секунды до повтора). '''
+    rule = settings.RATELIMITS.get(view_name)
+    if (
+        not settings.RATELIMIT_ENABLED
+        or rule is None
+        or request.method not in rule.get('methods', ('POST',))
+    ):
+        return None
+    for kind, ident, (capacity, period) in buckets(request, rule):
+        wait = take_token(
+            BUCKET_KEY.format(view_name, kind, ident), capacity, period
+        )
+        if wait:
+            count(view_name, kind)
+            logger.info(
+                'Лимит %s по %s %s: повтор через %.1f с',
+                view_name, kind, ident, wait,
+            )
+            return kind, wait
+    count(view_name, 'allowed')
+    return None
@@ -0,0 +1,134 @@
+import os
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.recorder import MigrationRecorder
+
+
+class AppDatabaseRouter:
+    ''' Выносит таблицы приложений из DATABASE_APPS_MAPPING в свои базы.
+
+    Каждый файл SQLite имеет свою блокировку записи, поэтому запись
+    миниатюры или кэша не ждёт транзакцию create_post и наоборот.
+    Приложение, чьей базы нет в DATABASES, остаётся в default.
+    '''
+
+    def alias_for(self, app_label):
+        alias = settings.DATABASE_APPS_MAPPING.get(app_label)
+        return alias if alias in settings.DATABASES else None
+
+    def db_for_read(self, model, **hints):
+        return self.alias_for(model._meta.app_label)
+
+    db_for_write = db_for_read
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        alias = self.alias_for(app_label)
+        if alias is not None:
+            return db == alias
+        if db in settings.DATABASE_APPS_MAPPING.values():
+            return False
+        return None
+
+
+_state = threading.local()
+# alias -> (mtime файла реплики, готова ли она).
+_ready = {}
+
+
+@contextmanager
+def read_from_replica():
+    ''' Внутри блока чтения основных моделей идут в REPLICA_DATABASE. '''
+    previous = getattr(_state, 'replica', False)
+    _state.replica = True
+    try:
+        yield
+    finally:
+        _state.replica = previous
+
+
+@contextmanager
+def read_from_primary():
+    ''' Отменяет read_from_replica() внутри блока. '''
+    previous = getattr(_state, 'replica', False)
+    _state.replica = False
+    try:
+        yield
+    finally:
+        _state.replica = previous
+
+
+def replica_migrations(path):
+    ''' Миграции в файле реплики. Файл открывается только на чтение
+    мимо соединений Django: реплика — всегда копия SQLite. '''
+    try:
+        with closing(sqlite3.connect(f'file:{path}?mode=ro', uri=True)) as db:
+            return set(db.execute('SELECT app, name FROM django_migrations'))
+    except sqlite3.Error:
+        return set()
+
+
+def replica_ready(alias):
+    ''' Файл реплики есть и в нём применены все миграции primary.
+
+    Иначе (refresh_replica ещё не запускался или migrate добавил
+    таблицы после копии) страницы с реплики падали бы. Проверка
+    повторяется, только когда refresh_replica перезапишет файл.
+    '''
+    path = connections[alias].settings_dict['NAME']
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return False
+    cached = _ready.get(alias)
+    if cached is None or cached[0] != mtime:
+        primary = MigrationRecorder(connections[DEFAULT_DB_ALIAS])
+        cached = _ready[alias] = (
+            mtime,
+            set(primary.applied_migrations()) <= replica_migrations(path),
+        )
+    return cached[1]
+
+
+def replica_alias():
+    ''' Реплика для текущего потока или None, если читать из primary.
+
+    Реплика, которая указывает на тот же файл, что и default (например,
+    TEST MIRROR в тестах), не используется: второе соединение не увидело
+    бы незакоммиченную транзакцию primary.
+    '''
+    alias = settings.REPLICA_DATABASE
+    if not getattr(_state, 'replica', False) or alias not in connections:
+        return None
+    name = connections[alias].settings_dict['NAME']
+    if name == connections[DEFAULT_DB_ALIAS].settings_dict['NAME']:
+        return None
+    return alias if replica_ready(alias) else None
+
+
+class ReplicaRouter:
+    ''' Отправляет чтения из read_from_replica() на реплику.
+
+    Запись всегда идёт в primary. Схема на реплику приезжает вместе
+    с копией базы (refresh_replica), поэтому migrate её не трогает.
+    '''
+
+    def db_for_read(self, model, **hints):
+        return replica_alias()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        primary = {DEFAULT_DB_ALIAS, settings.REPLICA_DATABASE}
+        if obj1._state.db in primary and obj2._state.db in primary:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == settings.REPLICA_DATABASE:
+            return False
+        return None
@@ -0,0 +1,37 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+FILE_CACHE = 'django.core.cache.backends.filebased.FileBasedCache'
+
+
+def temp_file_caches(root):
+    ''' CACHES, где файловые кэши перенесены в каталог root. '''
+    return {
+        alias: (
+            {**config, 'LOCATION': f'{root}/{alias}'}
+            if config['BACKEND'] == FILE_CACHE else config
+        )
+        for alias, config in settings.CACHES.items()
+    }
+
+
+class TempCacheRunner(DiscoverRunner):
+    ''' Тесты пишут файловые кэши во временный каталог, а не в
+    BASE_DIR/cache рабочего сайта. '''
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_dir = tempfile.mkdtemp(prefix='yatube-cache-')
+        self.cache_settings = override_settings(
+            CACHES=temp_file_caches(self.cache_dir)
+        )
+        self.cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_settings.disable()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
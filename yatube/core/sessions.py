@@ -0,0 +1,117 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.backends.base import CreateError, SessionBase
+from django.core.cache import caches
+
+KEY_PREFIX = 'core.sessions:'
+MISSING = '__missing__'
+
+
+class SessionStore(SessionBase):
+    ''' Сессии с общим кэшем перед отдельным хранилищем.
+
+    Хранилище задаётся SESSION_BACKING_ENGINE (по умолчанию файловое),
+    поэтому чтение и запись сессий не трогают основную базу SQLite.
+    Кэш SESSION_CACHE_ALIAS хранит и данные, и отметку «такой сессии
+    нет», так что запросы с устаревшей кукой тоже не ходят в хранилище.
+    Кэш должен быть общим для воркеров (проверка core.E001), иначе
+    выход из аккаунта в одном воркере не видели бы остальные.
+    '''
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        self._cache = caches[settings.SESSION_CACHE_ALIAS]
+        super().__init__(session_key)
+
+    @staticmethod
+    def backing_class():
+        return import_module(settings.SESSION_BACKING_ENGINE).SessionStore
+
+    def backing(self, session_key):
+        return self.backing_class()(session_key)
+
+    def cache_timeout(self, expiry=None):
+        return min(
+            self.get_expiry_age(expiry=expiry),
+            settings.SESSION_CACHE_TIMEOUT,
+        )
+
+    def cache_get(self, session_key):
+        try:
+            return self._cache.get(self.cache_key_prefix + session_key)
+        except Exception:
+            return None
+
+    def load(self):
+        data = self.cache_get(self.session_key)
+        if data == MISSING:
+            self._session_key = None
+            return {}
+        if data is not None:
+            return data
+        key = self.session_key
+        store = self.backing(key)
+        data = store.load()
+        if store.session_key is None:
+            self._cache.set(
+                self.cache_key_prefix + key,
+                MISSING,
+                settings.SESSION_CACHE_TIMEOUT,
+            )
+            self._session_key = None
+            return {}
+        self._session_key = store.session_key
+        self._cache.set(
+            self.cache_key_prefix + self._session_key,
+            data,
+            self.cache_timeout(data.get('_session_expiry')),
+        )
+        return data
+
+    def exists(self, session_key):
+        if not session_key:
+            return False
+        data = self.cache_get(session_key)
+        if data is not None:
+            return data != MISSING
+        return self.backing_class()().exists(session_key)
+
+    def create(self):
+        while True:
+            self._session_key = self._get_new_session_key()
+            try:
+                self.save(must_create=True)
+            except CreateError:
+                continue
+            self.modified = True
+            return
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        data = self._get_session(no_load=must_create)
+        store = self.backing(self.session_key)
+        store._session_cache = data
+        store.save(must_create=must_create)
+        self._cache.set(
+            self.cache_key_prefix + self.session_key,
+            data,
+            self.cache_timeout(),
+        )
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        self.backing(session_key).delete(session_key)
+        self._cache.set(
+            self.cache_key_prefix + session_key,
+            MISSING,
+            settings.SESSION_CACHE_TIMEOUT,
+        )
+
+    @classmethod
+    def clear_expired(cls):
+        cls.backing_class().clear_expired()
@@ -0,0 +1,35 @@
+from django import template
+
+from core.pagecache import hole_marker, render_hole
+
+register = template.Library()
+
+
+class HoleNode(template.Node):
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def render(self, context):
+        request = context.get('request')
+        args = [arg.resolve(context) for arg in self.args]
+        if getattr(request, 'punch_holes', False):
+            return hole_marker(self.name, args)
+        return render_hole(request, self.name, *args)
+
+
+@register.tag
+def hole(parser, token):
+    ''' {% hole "name" arg ... %} — личный кусок страницы.
+
+    Обычно выводит результат функции, зарегистрированной через
+    core.pagecache.register_hole; при рендере для общего кэша —
+    метку, которую shared_cache_page заполнит на каждый запрос.
+    '''
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} ожидает имя дыры'
+        )
+    name = bits[1].strip('\'"')
+    return HoleNode(name, [parser.compile_filter(bit) for bit in bits[2:]])
@@ -1,6 +1,62 @@
+import gzip
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import closing
+from datetime import timedelta
 from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
 
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core import mail
+from django.core.cache import caches
+from django.core.checks import run_checks
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import connection, connections, router, transaction
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import (RequestFactory, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import resolve
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+
+from .backup import rotate_backups
+from .db import copy_database
+from .mail import flush_outbox
+from .middleware import ReplicaMiddleware
+from .models import OutboxMessage, Task
+from .purge import get_dispatcher
+from .ratelimit import client_ip, counters, fallback, take_token
+from .pagecache import HOLES, register_hole, render_hole
+from .routers import AppDatabaseRouter, read_from_replica, replica_alias
+from .sessions import SessionStore
+from .warmup import warmup
+from .writequeue import WriteQueue, write
+from .queue import claim, run_pending, task
+
+CALLS = []
+
+
+@task(name='core.test.record', max_attempts=2)
+def record(value):
+    CALLS.append(value)
+
+
+@task(name='core.test.explode', max_attempts=2)
+def explode():
+    raise RuntimeError('boom')
+
+
+class BrokenBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError('SMTP недоступен')
 
 
 class CoreViewTest(TestCase):
@@ -9,3 +65,604 @@ class CoreViewTest(TestCase):
         response = self.client.get('/nonexist-page')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class RunWorkersTest(TransactionTestCase):
+    def test_delay_queues_and_worker_runs(self):
+        ''' delay() пишет задачу в БД, воркер выполняет и удаляет её. '''
+        CALLS.clear()
+        record.delay('hello')
+        self.assertEqual(CALLS, [])
+        self.assertEqual(Task.objects.count(), 1)
+        call_command('run_workers', once=True, workers=2, stdout=StringIO())
+        self.assertEqual(CALLS, ['hello'])
+        self.assertFalse(Task.objects.exists())
+
+
+class WriteQueueTest(TransactionTestCase):
+    def create(self, name):
+        if name == 'broken':
+            raise ValueError(name)
+        return Task.objects.create(name=name, payload='{}').name
+
+    def test_writes_are_batched_and_isolated(self):
+        ''' Пачка коммитится целиком, упавшая запись не мешает соседям. '''
+        writer = WriteQueue(batch_size=10, linger=0.05)
+        futures = [
+            writer.submit(self.create, name)
+            for name in ('first', 'broken', 'second')
+        ]
+        self.assertEqual(futures[0].result(timeout=5), 'first')
+        self.assertEqual(futures[2].result(timeout=5), 'second')
+        self.assertIsInstance(futures[1].exception(), ValueError)
+        self.assertEqual(
+            set(Task.objects.values_list('name', flat=True)),
+            {'first', 'second'},
+        )
+
+    def test_writer_commits_with_full_sync(self):
+        ''' Писатель ждёт fsync на COMMIT, общий normal его не касается. '''
+        def synchronous():
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA synchronous')
+                return cursor.fetchone()[0]
+
+        writer = WriteQueue(batch_size=1, linger=0)
+        # 2 — FULL.
+        self.assertEqual(writer.submit(synchronous).result(timeout=5), 2)
+
+    def test_write_inside_transaction_runs_inline(self):
+        ''' В открытой транзакции запись выполняется в текущем потоке. '''
+        with transaction.atomic():
+            thread = write(threading.current_thread)
+        self.assertIs(thread, threading.current_thread())
+
+
+class TaskQueueTest(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_failed_task_is_retried_with_backoff(self):
+        ''' Упавшая задача откладывается, после max_attempts — FAILED. '''
+        job = explode.delay()
+        self.assertEqual(run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Task.QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertEqual(run_pending(), 0)
+        Task.objects.update(run_at=timezone.now())
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Task.FAILED)
+        self.assertIn('boom', job.last_error)
+
+    def test_expired_lease_is_claimed_again(self):
+        ''' Задачу умершего воркера забирают после истечения аренды. '''
+        job = record.delay('again')
+        self.assertEqual(claim(10), [job.pk])
+        self.assertEqual(claim(10), [])
+        Task.objects.update(
+            claimed_at=timezone.now() - timedelta(
+                seconds=settings.TASKS_LEASE + 1
+            )
+        )
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(CALLS, ['again'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_task_killing_workers_fails_after_max_attempts(self):
+        ''' Задача, на которой воркеры умирают, в итоге помечается FAILED. '''
+        job = record.delay('never')
+        Task.objects.update(
+            status=Task.RUNNING, attempts=record.max_attempts,
+            claimed_at=timezone.now() - timedelta(
+                seconds=settings.TASKS_LEASE + 1
+            ),
+        )
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Task.FAILED)
+        self.assertEqual(CALLS, [])
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_mode(self):
+        ''' В eager-режиме задача выполняется сразу. '''
+        record.delay('now')
+        self.assertEqual(CALLS, ['now'])
+        self.assertFalse(Task.objects.exists())
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.OutboxBackend',
+    OUTBOX_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class OutboxTest(TestCase):
+    def test_flush_sends_batch_and_marks_sent(self):
+        ''' Письма копятся в outbox и уходят пачками при flush. '''
+        for i in range(3):
+            mail.send_mail(f'Тема {i}', 'Текст', 'a@yatube.ru', ['b@ya.ru'])
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(flush_outbox(batch_size=2, rate=1000), (2, 0))
+        self.assertEqual(flush_outbox(batch_size=2, rate=1000), (1, 0))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(
+            OutboxMessage.objects.filter(status=OutboxMessage.SENT).count(),
+            3
+        )
+
+    def test_failed_delivery_is_retried_later(self):
+        ''' Ошибка отправки откладывает письмо с backoff. '''
+        mail.send_mail('Тема', 'Текст', 'a@yatube.ru', ['b@ya.ru'])
+        with override_settings(OUTBOX_EMAIL_BACKEND='core.test.BrokenBackend'):
+            self.assertEqual(flush_outbox(rate=1000), (0, 1))
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.status, OutboxMessage.PENDING)
+        self.assertEqual(message.attempts, 1)
+        self.assertGreater(message.next_attempt, timezone.now())
+
+
+class HybridSessionTest(TestCase):
+    def setUp(self):
+        caches['sessions'].clear()
+
+    def test_file_caches_stay_out_of_base_dir(self):
+        ''' Тесты не пишут файловые кэши в BASE_DIR/cache сайта. '''
+        for alias in ('sessions', 'users'):
+            self.assertFalse(caches[alias]._dir.startswith(
+                os.path.join(settings.BASE_DIR, 'cache')
+            ))
+
+    def test_session_roundtrip_uses_cache(self):
+        ''' Сохранённая сессия читается из кэша без обращения к хранилищу. '''
+        session = SessionStore()
+        session['answer'] = 42
+        session.save()
+        backing = SessionStore.backing_class()(session.session_key)
+        self.assertEqual(backing.load()['answer'], 42)
+        with self.settings(SESSION_BACKING_ENGINE='core.test'):
+            self.assertEqual(SessionStore(session.session_key)['answer'], 42)
+
+    def test_unknown_key_is_negatively_cached(self):
+        ''' Несуществующая сессия запоминается как отсутствующая. '''
+        session = SessionStore('x' * 32)
+        self.assertEqual(session.load(), {})
+        self.assertIsNone(session.session_key)
+        self.assertFalse(SessionStore().exists('x' * 32))
+
+    def test_process_local_cache_is_rejected(self):
+        ''' Кэш сессий в памяти процесса — ошибка проверки. '''
+        with override_settings(CACHES={
+            **settings.CACHES,
+            'sessions': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            },
+        }):
+            errors = [error.id for error in run_checks()]
+        self.assertIn('core.E001', errors)
+
+    def test_logout_flushes_session(self):
+        ''' После выхода сессия не восстанавливается из кэша. '''
+        user = get_user_model().objects.create_user(username='auth')
+        self.client.force_login(user)
+        key = self.client.session.session_key
+        self.client.get('/auth/logout/')
+        self.assertFalse(SessionStore().exists(key))
+
+
+class WarmupTest(TestCase):
+    def test_warmup_compiles_templates_and_primes_pages(self):
+        ''' Прогрев компилирует шаблоны, строит URL и прогоняет главную. '''
+        report = warmup()
+        self.assertGreater(report['templates'], 0)
+        self.assertGreater(report['urls'], 0)
+        self.assertEqual(report['pages'], {'/': HTTPStatus.OK})
+
+    def test_warmup_closes_connections(self):
+        ''' После прогрева соединения закрыты и не уйдут в форк воркера. '''
+        with mock.patch.object(connections, 'close_all') as close_all:
+            warmup(prime=False)
+        close_all.assert_called_once_with()
+
+
+class SqlitePragmaTest(TestCase):
+    def test_connection_is_tuned(self):
+        ''' Соединение получает PRAGMA из SQLITE_PRAGMAS. '''
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+
+class AppDatabaseRouterTest(TestCase):
+    def test_hot_tables_have_own_databases(self):
+        ''' Миниатюры читаются и пишутся в свою базу. '''
+        from sorl.thumbnail.models import KVStore
+
+        self.assertEqual(router.db_for_write(KVStore), 'thumbnails')
+        self.assertEqual(router.db_for_read(KVStore), 'thumbnails')
+        self.assertEqual(router.db_for_write(OutboxMessage), 'default')
+
+    def test_migrations_follow_mapping(self):
+        ''' Таблицы создаются только в своей базе. '''
+        db_router = AppDatabaseRouter()
+        self.assertTrue(db_router.allow_migrate('thumbnails', 'thumbnail'))
+        self.assertFalse(db_router.allow_migrate('default', 'thumbnail'))
+        self.assertFalse(db_router.allow_migrate('thumbnails', 'posts'))
+        self.assertIsNone(db_router.allow_migrate('default', 'posts'))
+
+
+class ReplicaTest(TestCase):
+    def setUp(self):
+        self.seen = []
+        self.middleware = ReplicaMiddleware(lambda request: HttpResponse())
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.replica = os.path.join(directory.name, 'replica.sqlite3')
+        self.copy_migrations()
+
+    def copy_migrations(self, skip=0):
+        ''' Реплика, в которой применены миграции primary, кроме skip
+        последних. '''
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT app, name FROM django_migrations')
+            rows = cursor.fetchall()
+        with closing(sqlite3.connect(self.replica)) as db:
+            db.execute('DROP TABLE IF EXISTS django_migrations')
+            db.execute('CREATE TABLE django_migrations '
+                       '(id INTEGER PRIMARY KEY, app, name, applied)')
+            db.executemany(
+                "INSERT INTO django_migrations (app, name, applied) "
+                "VALUES (?, ?, '2024-01-01')",
+                rows[:len(rows) - skip],
+            )
+            db.commit()
+        # Новое mtime заставит перепроверить реплику.
+        os.utime(self.replica, ns=(time.time_ns(), time.time_ns()))
+
+    def view(self, request):
+        self.seen.append(replica_alias())
+        return HttpResponse()
+
+    def get(self, path, **cookies):
+        request = RequestFactory().get(path)
+        request.COOKIES.update(cookies)
+        request.resolver_match = resolve(path)
+        replica = connections['replica'].settings_dict
+        with mock.patch.dict(replica, NAME=self.replica):
+            response = self.middleware.process_view(request, self.view, (), {})
+            if response is None:
+                self.view(request)
+        return self.seen.pop()
+
+    def test_listing_reads_from_replica(self):
+        ''' Ленты и страница поста читаются с реплики. '''
+        self.assertEqual(self.get('/'), 'replica')
+        self.assertEqual(self.get('/group/slug/'), 'replica')
+
+    def test_other_views_read_from_primary(self):
+        ''' Остальные страницы и закреплённый клиент читают из primary. '''
+        self.assertIsNone(self.get('/search/'))
+        self.assertIsNone(self.get('/', primary_pin='1'))
+        self.assertEqual(router.db_for_write(Task), 'default')
+
+    def test_stale_or_missing_replica_is_not_used(self):
+        ''' Без файла реплики или без свежих миграций читаем из primary. '''
+        self.copy_migrations(skip=1)
+        self.assertIsNone(self.get('/'))
+        os.remove(self.replica)
+        self.assertIsNone(self.get('/'))
+        self.copy_migrations()
+        self.assertEqual(self.get('/'), 'replica')
+
+    def test_holes_and_user_read_from_primary(self):
+        ''' Дыры страницы и пользователь запроса не читают реплику. '''
+        @register_hole('test-alias')
+        def alias_hole(request):
+            return str(replica_alias())
+
+        self.addCleanup(HOLES.pop, 'test-alias')
+        request = RequestFactory().get('/')
+        request.resolver_match = resolve('/')
+        request.user = SimpleLazyObject(
+            lambda: self.seen.append(replica_alias()) or AnonymousUser()
+        )
+        with mock.patch.dict(
+            connections['replica'].settings_dict, NAME=self.replica
+        ):
+            self.middleware.process_view(request, self.view, (), {})
+            with read_from_replica():
+                self.assertEqual(render_hole(request, 'test-alias'), 'None')
+        self.assertEqual(self.seen, [None, 'replica'])
+
+    def test_get_write_pins_client_to_primary(self):
+        ''' Подписка через GET тоже закрепляет клиента за primary. '''
+        user = get_user_model().objects.create_user(username='auth')
+        get_user_model().objects.create_user(username='star')
+        self.client.force_login(user)
+        response = self.client.get('/profile/star/follow/')
+        self.assertIn('primary_pin', response.cookies)
+
+    def test_mirror_is_not_used(self):
+        ''' Реплика-зеркало default не открывает второе соединение. '''
+        with read_from_replica():
+            self.assertIsNone(replica_alias())
+
+    def test_write_pins_client_to_primary(self):
+        ''' После записи клиент получает куку закрепления за primary. '''
+        user = get_user_model().objects.create_user(username='auth')
+        self.client.force_login(user)
+        response = self.client.post('/create/', {'text': 'Новый пост'})
+        self.assertIn('primary_pin', response.cookies)
+        response = self.client.get('/')
+        self.assertNotIn('primary_pin', response.cookies)
+
+
+class CopyDatabaseTest(TestCase):
+    def test_copy_database(self):
+        ''' refresh_replica переносит содержимое базы в копию. '''
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'db.sqlite3')
+            target = os.path.join(directory, 'replica.sqlite3')
+            with closing(sqlite3.connect(source)) as db:
+                db.execute('CREATE TABLE post (text TEXT)')
+                db.execute("INSERT INTO post VALUES ('Пост')")
+                db.commit()
+            copy_database(source, target, pages=1, sleep=0)
+            with closing(sqlite3.connect(target)) as db:
+                rows = db.execute('SELECT text FROM post').fetchall()
+        self.assertEqual(rows, [('Пост',)])
+
+    def test_copy_busy_database_finishes_in_one_step(self):
+        ''' Если запись всё время перезапускает копию, база копируется
+        одним шагом. '''
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'db.sqlite3')
+            target = os.path.join(directory, 'copy.sqlite3')
+            with closing(sqlite3.connect(source)) as db:
+                db.execute('CREATE TABLE post (text TEXT)')
+                db.executemany(
+                    'INSERT INTO post VALUES (?)',
+                    [('x' * 1000,)] * 20,
+                )
+                db.commit()
+            with closing(sqlite3.connect(source)) as writer:
+                def write(status, remaining, total):
+                    writer.execute("INSERT INTO post VALUES ('Пост')")
+                    writer.commit()
+
+                with self.assertLogs('core.db', 'WARNING'):
+                    restarts = copy_database(
+                        source, target, pages=1, sleep=0, progress=write,
+                        restarts=2,
+                    )
+            with closing(sqlite3.connect(target)) as db:
+                [[count]] = db.execute('SELECT COUNT(*) FROM post')
+        self.assertEqual(restarts, 3)
+        self.assertGreater(count, 20)
+
+
+class BackupTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.source = os.path.join(self.directory, 'db.sqlite3')
+        with closing(sqlite3.connect(self.source)) as db:
+            db.execute('CREATE TABLE post (text TEXT)')
+            db.execute("INSERT INTO post VALUES ('Пост')")
+            db.commit()
+
+    def test_backup_is_compressed_copy(self):
+        ''' backup_db пишет сжатую целую копию базы. '''
+        output = os.path.join(self.directory, 'backups')
+        default = connections['default'].settings_dict
+        with mock.patch.dict(default, NAME=self.source):
+            call_command(
+                'backup_db', output_dir=output, pages=1, sleep=0,
+                stdout=StringIO(),
+            )
+        [name] = os.listdir(output)
+        self.assertTrue(name.startswith('default-'))
+        restored = os.path.join(self.directory, 'restored.sqlite3')
+        with gzip.open(os.path.join(output, name)) as src:
+            with open(restored, 'wb') as dst:
+                dst.write(src.read())
+        with closing(sqlite3.connect(restored)) as db:
+            rows = db.execute('SELECT text FROM post').fetchall()
+        self.assertEqual(rows, [('Пост',)])
+
+    def test_rotation_keeps_latest(self):
+        ''' Ротация удаляет самые старые снимки своей базы. '''
+        names = [
+            'default-20240101-000000.sqlite3.gz',
+            'default-20240102-000000.sqlite3.gz',
+            'default-20240103-000000.sqlite3',
+            'replica-20240101-000000.sqlite3.gz',
+        ]
+        for name in names:
+            open(os.path.join(self.directory, name), 'w').close()
+        removed = rotate_backups('default', self.directory, keep=2)
+        self.assertEqual(removed, names[:1])
+        self.assertTrue(
+            os.path.exists(os.path.join(self.directory, names[3]))
+        )
+
+
+@override_settings(RATELIMITS={
+    'posts:add_comment': {'user': (2, 60), 'ip': (3, 60)},
+})
+class RateLimitTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from posts.models import Post
+        cls.user = get_user_model().objects.create_user(username='spam')
+        cls.other = get_user_model().objects.create_user(username='other')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        cls.url = f'/posts/{cls.post.pk}/comment/'
+
+    def setUp(self):
+        caches['default'].clear()
+        fallback.clear()
+
+    def comment(self, user, **extra):
+        self.client.force_login(user)
+        return self.client.post(self.url, {'text': 'Спам'}, **extra)
+
+    def test_user_bucket_rejects_before_view(self):
+        ''' Сверх лимита — 429 с Retry-After и без записи в базу. '''
+        for _ in range(2):
+            self.assertEqual(self.comment(self.user).status_code,
+                             HTTPStatus.FOUND)
+        response = self.comment(self.user)
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertTemplateUsed(response, 'core/429.html')
+        self.assertEqual(self.post.comments.count(), 2)
+        self.assertEqual(
+            counters()['posts:add_comment'],
+            {'allowed': 2, 'user': 1, 'ip': 0},
+        )
+
+    def test_ip_bucket_is_shared_by_users(self):
+        ''' Ведро IP общее для всех пользователей с одного адреса. '''
+        self.comment(self.user)
+        self.comment(self.user)
+        self.assertEqual(self.comment(self.other).status_code,
+                         HTTPStatus.FOUND)
+        response = self.comment(self.other, REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertEqual(counters()['posts:add_comment']['ip'], 1)
+        self.client.logout()
+        other_ip = self.client.post(
+            self.url, {'text': 'Спам'}, REMOTE_ADDR='10.0.0.2'
+        )
+        self.assertEqual(other_ip.status_code, HTTPStatus.FOUND)
+
+    @override_settings(RATELIMIT_PROXY_COUNT=2)
+    def test_client_ip_behind_trusted_proxies(self):
+        ''' Клиент — адрес перед доверенными прокси, подделка левее
+        ничего не меняет. '''
+        factory = RequestFactory()
+        cases = (
+            ('1.1.1.1, 10.0.0.1', '1.1.1.1'),
+            ('6.6.6.6, 1.1.1.1, 10.0.0.1', '1.1.1.1'),
+            ('10.0.0.1', '127.0.0.1'),
+        )
+        for forwarded, expected in cases:
+            with self.subTest(forwarded=forwarded):
+                request = factory.get('/', HTTP_X_FORWARDED_FOR=forwarded)
+                self.assertEqual(client_ip(request), expected)
+        with override_settings(RATELIMIT_PROXY_COUNT=0):
+            self.assertEqual(client_ip(request), '127.0.0.1')
+
+    def test_json_response(self):
+        ''' JSON-запрос получает ответ 429 тоже в JSON. '''
+        with override_settings(RATELIMITS={
+            'posts:bulk_follow': {'user': (1, 60)},
+        }):
+            self.client.force_login(self.user)
+            for _ in range(2):
+                response = self.client.post(
+                    '/follow/bulk/', '{"usernames": ["other"]}',
+                    content_type='application/json',
+                )
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertEqual(response.json()['retry_after'], 60)
+
+    def test_bucket_refills(self):
+        ''' Жетоны возвращаются со скоростью capacity / period. '''
+        self.assertEqual(take_token('bucket', 1, 10, now=100), 0)
+        self.assertAlmostEqual(take_token('bucket', 1, 10, now=104), 6)
+        self.assertEqual(take_token('bucket', 1, 10, now=110), 0)
+
+    @override_settings(RATELIMIT_CACHE='missing')
+    def test_fallback_without_cache(self):
+        ''' Без настроенного кэша вёдра живут в памяти процесса. '''
+        self.assertEqual(take_token('bucket', 1, 10, now=100), 0)
+        self.assertEqual(fallback.get('bucket'), (0, 100))
+        self.assertIsNone(caches['default'].get('bucket'))
+
+
+class StandInProxy(BaseHTTPRequestHandler):
+    ''' Записывает PURGE/BAN вместо настоящего прокси. '''
+    received = []
+
+    def do_PURGE(self):
+        self.received.append(
+            (self.command, set(self.headers['Surrogate-Key'].split()))
+        )
+        self.send_response(HTTPStatus.OK)
+        self.end_headers()
+
+    do_BAN = do_PURGE
+
+    def log_message(self, *args):
+        pass
+
+
+class CachePurgeTest(TransactionTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInProxy)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}/'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        from posts.models import Post
+        StandInProxy.received.clear()
+        self.author = get_user_model().objects.create_user(username='auth')
+        self.reader = get_user_model().objects.create_user(username='reader')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+
+    def purged(self):
+        get_dispatcher().wait()
+        keys = set().union(*(keys for _, keys in StandInProxy.received))
+        StandInProxy.received.clear()
+        return keys
+
+    def test_post_comment_and_follow_purge_keys(self):
+        ''' Изменения уходят на прокси с ключами поста и автора. '''
+        from posts.models import Comment, Follow
+        with override_settings(CACHE_PURGE_URLS=[self.url]):
+            self.post.text = 'Исправлено'
+            self.post.save()
+            self.assertEqual(
+                self.purged(),
+                {f'post-{self.post.pk}', 'author-auth', 'index', 'groups',
+                 'trending'},
+            )
+            Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий'
+            )
+            self.assertEqual(self.purged(), {f'post-{self.post.pk}'})
+            Follow.objects.follow(self.reader.pk, [self.author.pk])
+            Follow.objects.unfollow(self.reader.pk, [self.author.pk])
+            self.assertEqual(self.purged(), {'author-auth'})
+
+    def test_rolled_back_changes_are_not_purged(self):
+        ''' При откате транзакции прокси ничего не получает. '''
+        with override_settings(
+            CACHE_PURGE_URLS=[self.url], CACHE_PURGE_METHOD='BAN'
+        ):
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    self.post.save()
+                    raise RuntimeError
+            self.post.save()
+            get_dispatcher().wait()
+        [(method, keys)] = StandInProxy.received
+        self.assertEqual(method, 'BAN')
+        self.assertIn(f'post-{self.post.pk}', keys)
+
+    def test_disabled_without_urls(self):
+        ''' Без CACHE_PURGE_URLS запросов нет. '''
+        self.post.save()
+        self.assertEqual(self.purged(), set())
@@ -10,8 +10,9 @@ def page_not_found(request, exception):
     )
 
 
-def csrf_failure(request, reason=''):
-    return render(request, 'core/403csrf.html')
+def csrf_failure(request, reason='', exception=None):
+    ''' CSRF_FAILURE_VIEW и handler403: Django передаёт сюда exception. '''
+    return render(request, 'core/403csrf.html', status=403)
 
 
 def server_error(request):
@@ -0,0 +1,143 @@
+import importlib
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.db import connections
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.template.utils import get_app_template_dirs
+from django.test import RequestFactory
+from django.urls import NoReverseMatch, get_resolver, reverse
+
+
+def template_names(engine):
+    ''' Имена всех шаблонов из каталогов движка. '''
+    dirs = list(engine.engine.dirs)
+    if engine.engine.app_dirs:
+        dirs += get_app_template_dirs('templates')
+    for directory in dirs:
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if filename.endswith(('.html', '.txt')):
+                    path = os.path.join(root, filename)
+                    yield os.path.relpath(path, directory)
+
+
+def compile_templates():
+    ''' Компилирует шаблоны в кэш cached.Loader, возвращает их число. '''
+    compiled = 0
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        for name in set(template_names(engine)):
+            try:
+                engine.get_template(name)
+            except TemplateSyntaxError:
+                continue
+            compiled += 1
+    return compiled
+
+
+def resolve_urls():
+    ''' Строит резолверы всех пространств имён и reverse() без аргументов. '''
+    names = []
+
+    def walk(resolver, prefix):
+        for name in resolver.reverse_dict:
+            if isinstance(name, str):
+                names.append(prefix + name)
+        for namespace, (_, sub) in resolver.namespace_dict.items():
+            walk(sub, f'{prefix}{namespace}:')
+
+    walk(get_resolver(), '')
+    for name in names:
+        try:
+            reverse(name)
+        except NoReverseMatch:
+            pass
+    return len(names)
+
+
+def import_modules(modules):
+    ''' Импортирует тяжёлые модули и возвращает [(модуль, секунды)]. '''
+    timings = []
+    for module in modules:
+        started = time.perf_counter()
+        importlib.import_module(module)
+        timings.append((module, time.perf_counter() - started))
+    return timings
+
+
+def prime_pages(paths):
+    ''' Прогоняет страницы через весь стек middleware, заполняя кэши. '''
+    handler = BaseHandler()
+    handler.load_middleware()
+    factory = RequestFactory(HTTP_HOST=settings.WARMUP_HOST)
+    return {
+        path: handler.get_response(factory.get(path)).status_code
+        for path in paths
+    }
+
+
+def warmup_paths():
+    from posts.models import Group
+
+    paths = [reverse(name) for name in settings.WARMUP_URLS]
+    slugs = Group.objects.values_list('slug', flat=True)
+    paths += [
+        reverse('posts:group_list', args=[slug])
+        for slug in slugs[:settings.WARMUP_GROUPS]
+    ]
+    return paths
+
+
+def warmup(prime=True):
+    ''' Прогрев воркера перед первыми запросами.
+
+    В конце закрывает соединения с БД: при gunicorn --preload прогрев идёт
+    в мастере, и открытое им соединение унаследовали бы все воркеры.
+    '''
+    report = {
+        'imports': import_modules(settings.WARMUP_IMPORTS),
+        'templates': compile_templates(),
+        'urls': resolve_urls(),
+    }
+    try:
+        if prime:
+            report['pages'] = prime_pages(warmup_paths())
+    finally:
+        connections.close_all()
+    return report
+
+
+def import_costs(top=20):
+    ''' Самые дорогие импорты при загрузке WSGI-приложения.
+
+    Запускает чистый интерпретатор с -X importtime и возвращает
+    [(модуль, собственное время мкс, накопленное мкс)] по убыванию.
+    '''
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='yatube.settings')
+    env.pop('YATUBE_WARMUP', None)
+    result = subprocess.run(
+        [
+            sys.executable, '-X', 'importtime', '-c',
+            'import yatube.wsgi',
+        ],
+        cwd=settings.BASE_DIR,
+        env=env,
+        stderr=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        universal_newlines=True,
+    )
+    costs = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, module = line[len('import time:'):].split('|')
+        costs.append((module.strip(), int(own), int(cumulative)))
+    costs.sort(key=lambda cost: cost[2], reverse=True)
+    return costs[:top]
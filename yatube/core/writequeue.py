@@ -0,0 +1,113 @@
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class WriteQueue:
+    ''' Очередь мелких записей с одним потоком-писателем.
+
+    SQLite пускает одного писателя, поэтому параллельные запросы
+    с короткими INSERT упираются в блокировку и busy_timeout. Здесь
+    вызовы складываются в очередь, а поток-писатель выполняет их
+    пачками до WRITE_QUEUE_BATCH штук в одной транзакции: одна
+    блокировка и один fsync на пачку. Каждый вызов идёт в своей
+    точке сохранения, так что ошибка одного не откатывает соседей.
+    Future получает результат только после COMMIT пачки.
+
+    Соединение писателя работает с synchronous=WRITE_QUEUE_SYNCHRONOUS
+    (по умолчанию full): с общим для сайта normal в режиме WAL COMMIT
+    не ждёт fsync, и последние пачки пропали бы при сбое питания.
+    fsync всё равно один на пачку, так что цена невелика.
+    '''
+
+    def __init__(self, batch_size=None, linger=None):
+        self.batch_size = batch_size or settings.WRITE_QUEUE_BATCH
+        self.linger = (
+            settings.WRITE_QUEUE_LINGER if linger is None else linger
+        )
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def submit(self, func, *args, **kwargs):
+        ''' Ставит вызов в очередь и возвращает Future с его результатом. '''
+        future = Future()
+        self.queue.put((func, args, kwargs, future))
+        self.ensure_writer()
+        return future
+
+    def ensure_writer(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name='sqlite-writer', daemon=True
+                )
+                self.thread.start()
+
+    def take_batch(self):
+        batch = [self.queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get(timeout=self.linger))
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        while True:
+            self.write_batch(self.take_batch())
+
+    def write_batch(self, batch):
+        results = []
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'PRAGMA synchronous = '
+                    f'{settings.WRITE_QUEUE_SYNCHRONOUS}'
+                )
+            with transaction.atomic():
+                for func, args, kwargs, future in batch:
+                    try:
+                        with transaction.atomic():
+                            results.append((future, func(*args, **kwargs)))
+                    except Exception as error:
+                        future.set_exception(error)
+        except Exception as error:
+            logger.exception('Пачка из %s записей не сохранена', len(batch))
+            for future, _ in results:
+                future.set_exception(error)
+            connection.close()
+            return
+        for future, result in results:
+            future.set_result(result)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = WriteQueue()
+        return _writer
+
+
+def write(func, *args, **kwargs):
+    ''' Выполняет запись через общий поток-писатель и ждёт COMMIT.
+
+    Внутри открытой транзакции, а также при WRITE_QUEUE_ENABLED=False
+    вызов выполняется сразу в текущем потоке: писатель не увидел бы
+    незакоммиченные данные вызывающего и ждал бы его блокировку.
+    '''
+    if not settings.WRITE_QUEUE_ENABLED or connection.in_atomic_block:
+        return func(*args, **kwargs)
+    future = get_writer().submit(func, *args, **kwargs)
+    return future.result(timeout=settings.WRITE_QUEUE_TIMEOUT)
@@ -1,9 +1,29 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin.widgets import ForeignKeyRawIdWidget
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
 
-from .models import Group, Post
+from .models import Comment, Follow, Group, Post
+from .search import filter_posts
+from .tasks import schedule_group_deletion
+from .utils import EstimatedCountPaginator
 
 
-class PostAdmin(admin.ModelAdmin):
+class BareRawIdWidget(ForeignKeyRawIdWidget):
+    ''' Raw-id поле без запроса подписи к выбранному объекту. '''
+
+    def label_and_url_for_value(self, value):
+        return '', ''
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    ''' Общие настройки списков для больших таблиц. '''
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+
+class PostAdmin(ScalableAdmin):
     list_display = (
         'pk',
         'text',
@@ -12,10 +32,103 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
-    empty_value_display = '-пусто-'
+    date_hierarchy = 'pub_date'
+    raw_id_fields = ('author',)
+    autocomplete_fields = ('group',)
+
+    def get_changelist_form(self, request, **kwargs):
+        ''' В строках списка группа вводится по id, без <select> групп. '''
+        kwargs.setdefault('widgets', {
+            'group': BareRawIdWidget(
+                Post._meta.get_field('group').remote_field, self.admin_site
+            ),
+        })
+        return super().get_changelist_form(request, **kwargs)
+
+    def get_search_results(self, request, queryset, search_term):
+        ''' Поиск по тексту идёт через FTS5-индекс, а не LIKE. '''
+        if not search_term:
+            return queryset, False
+        return filter_posts(queryset, search_term), False
+
+
+def cascade_models(model, seen=None):
+    ''' Модели, строки которых каскадно удаляются вместе с model. '''
+    seen = set() if seen is None else seen
+    for relation in model._meta.related_objects:
+        related = relation.related_model
+        if relation.on_delete is models.CASCADE and related not in seen:
+            seen.add(related)
+            cascade_models(related, seen)
+    return seen
+
+
+class BackgroundDeleteAdmin(admin.ModelAdmin):
+    ''' Удаление уходит в фоновую задачу schedule_deletion.
+
+    Страница подтверждения не собирает все зависимые объекты: у
+    активного автора их сотни тысяч, а сам каскад в запросе админки
+    держал бы блокировку записи SQLite до таймаута. Права на удаление
+    связанных объектов проверяются по моделям каскада, без чтения строк.
+    '''
+    # Функция (obj), ставящая удаление в очередь; обязательна.
+    schedule_deletion = None
+
+    def __init__(self, model, admin_site):
+        if self.schedule_deletion is None:
+            raise ImproperlyConfigured(
+                f'{type(self).__name__}.schedule_deletion не задан'
+            )
+        super().__init__(model, admin_site)
+
+    def get_deleted_objects(self, objs, request):
+        perms_needed = {
+            related._meta.verbose_name
+            for related in cascade_models(self.model)
+            if related in self.admin_site._registry
+            and not self.admin_site._registry[related].has_delete_permission(
+                request
+            )
+        }
+        return [str(obj) for obj in objs], {}, perms_needed, []
+
+    def delete_model(self, request, obj):
+        self.schedule_deletion(obj)
+        self.message_user(
+            request, f'«{obj}»: связанные данные удаляются в фоне.',
+            messages.INFO,
+        )
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            self.schedule_deletion(obj)
+
+
+class GroupAdmin(BackgroundDeleteAdmin):
+    list_display = ('pk', 'title', 'slug')
+    search_fields = ('title', 'slug')
+    prepopulated_fields = {'slug': ('title',)}
+    schedule_deletion = staticmethod(schedule_group_deletion)
+
+
+class CommentAdmin(ScalableAdmin):
+    list_display = ('pk', 'text', 'created', 'author', 'post')
+    list_select_related = ('author', 'post')
+    list_filter = ('created',)
+    date_hierarchy = 'created'
+    raw_id_fields = ('author', 'post')
+
+
+class FollowAdmin(ScalableAdmin):
+    list_display = ('pk', 'user', 'author')
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
 
 
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
+admin.site.register(Group, GroupAdmin)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(Follow, FollowAdmin)
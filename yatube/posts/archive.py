@@ -0,0 +1,44 @@
+from datetime import datetime
+from itertools import groupby
+
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import MonthlyPostCount
+
+
+def month_range(year, month):
+    ''' Границы месяца [start, end) для range scan по pub_date.
+
+    Неверный месяц — ValueError.
+    '''
+    start = timezone.make_aware(datetime(year, month, 1))
+    if month == 12:
+        end = timezone.make_aware(datetime(year + 1, 1, 1))
+    else:
+        end = timezone.make_aware(datetime(year, month + 1, 1))
+    return start, end
+
+
+def archive_nav(scope, scope_id, url_name, *args):
+    ''' Меню архива: [(год, [{month, count, url}])] по убыванию дат.
+
+    Один запрос по индексу корзин MonthlyPostCount, без GROUP BY
+    по posts_post.
+    '''
+    rows = MonthlyPostCount.objects.filter(
+        scope=scope, scope_id=scope_id, count__gt=0
+    ).order_by('-month').values_list('month', 'count')
+    return [
+        (year, [
+            {
+                'month': month,
+                'count': count,
+                'url': reverse(
+                    url_name, args=(*args, month.year, month.month)
+                ),
+            }
+            for month, count in months
+        ])
+        for year, months in groupby(rows, key=lambda row: row[0].year)
+    ]
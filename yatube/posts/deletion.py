@@ -0,0 +1,106 @@
+import time
+
+from django.conf import settings
+from django.db import transaction
+from sorl.thumbnail import delete as delete_image
+
+from .models import (ArchivedComment, ArchivedPost, Comment, Follow, Group,
+                     MonthlyPostCount, Post, Recommendation, User)
+
+
+def user_steps(user_id):
+    ''' Что удалить до самого пользователя, от листьев к постам: так ни
+    одна пачка не тянет за собой каскад неограниченного размера. '''
+    return (
+        (Comment.objects.filter(author_id=user_id), None),
+        (Comment.objects.filter(post__author_id=user_id), None),
+        (ArchivedComment.objects.filter(author_id=user_id), None),
+        (ArchivedComment.objects.filter(post__author_id=user_id), None),
+        (Follow.objects.filter(user_id=user_id), None),
+        (Follow.objects.filter(author_id=user_id), None),
+        (Recommendation.objects.filter(user_id=user_id), None),
+        (Recommendation.objects.filter(author_id=user_id), None),
+        (Post.objects.filter(author_id=user_id), 'image'),
+        (ArchivedPost.objects.filter(author_id=user_id), 'image'),
+    )
+
+
+def drop_files(names):
+    ''' Удаляет картинки вместе с миниатюрами sorl. '''
+    for name in names:
+        delete_image(name)
+
+
+def delete_chunk(queryset, size, file_field=None):
+    ''' Удаляет до size строк queryset отдельной транзакцией, файлы —
+    после неё. Возвращает число удалённых строк. '''
+    fields = ('pk', file_field) if file_field else ('pk',)
+    rows = list(queryset.order_by().values_list(*fields)[:size])
+    if not rows:
+        return 0
+    with transaction.atomic():
+        queryset.model.objects.filter(
+            pk__in=[row[0] for row in rows]
+        ).delete()
+    if file_field:
+        drop_files([row[1] for row in rows if row[1]])
+    return len(rows)
+
+
+def detach_chunk(queryset, size):
+    ''' Отвязывает от группы до size записей одним UPDATE. '''
+    pks = list(queryset.order_by().values_list('pk', flat=True)[:size])
+    if pks:
+        queryset.model.objects.filter(pk__in=pks).update(group=None)
+    return len(pks)
+
+
+def run_batches(chunks, pause=None):
+    ''' Выполняет шаги по очереди, пока каждый не вернёт 0.
+
+    Между пачками пауза DELETION_PAUSE: блокировка записи SQLite
+    отпускается, и запросы пользователей успевают записать своё.
+    '''
+    pause = settings.DELETION_PAUSE if pause is None else pause
+    total = 0
+    for chunk in chunks:
+        while True:
+            done = chunk()
+            if not done:
+                break
+            total += done
+            time.sleep(pause)
+    return total
+
+
+def purge_user(user_id, size=None):
+    ''' Пачками удаляет всё, что принадлежит пользователю, затем его
+    самого. Прерванный запуск можно повторить с того же места. '''
+    size = size or settings.DELETION_BATCH
+    total = run_batches(
+        lambda queryset=queryset, field=field: delete_chunk(
+            queryset, size, field
+        )
+        for queryset, field in user_steps(user_id)
+    )
+    MonthlyPostCount.objects.filter(
+        scope=MonthlyPostCount.AUTHOR, scope_id=user_id
+    ).delete()
+    User.objects.filter(pk=user_id).delete()
+    return total
+
+
+def purge_group(group_id, size=None):
+    ''' Пачками отвязывает записи от группы, затем удаляет её. '''
+    size = size or settings.DELETION_BATCH
+    total = run_batches(
+        lambda model=model: detach_chunk(
+            model.objects.filter(group_id=group_id), size
+        )
+        for model in (Post, ArchivedPost)
+    )
+    MonthlyPostCount.objects.filter(
+        scope=MonthlyPostCount.GROUP, scope_id=group_id
+    ).delete()
+    Group.objects.filter(pk=group_id).delete()
+    return total
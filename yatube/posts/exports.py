@@ -0,0 +1,69 @@
+import csv
+import json
+
+from .models import ArchivedComment, ArchivedPost, Comment, Post
+
+CHUNK_SIZE = 2000
+HEADER = ('type', 'id', 'post_id', 'date', 'group', 'text')
+
+
+class Echo:
+    ''' Псевдофайл для csv.writer: возвращает строку вместо записи. '''
+
+    def write(self, value):
+        return value
+
+
+def post_rows(model, author):
+    posts = model.objects.filter(author=author).order_by('pk').values_list(
+        'pk', 'pub_date', 'group__slug', 'text'
+    )
+    for pk, pub_date, group, text in posts.iterator(chunk_size=CHUNK_SIZE):
+        yield 'post', pk, pk, pub_date.isoformat(), group or '', text
+
+
+def comment_rows(model, author):
+    comments = model.objects.filter(author=author).order_by(
+        'pk'
+    ).values_list('pk', 'post_id', 'created', 'text')
+    for pk, post_id, created, text in comments.iterator(
+        chunk_size=CHUNK_SIZE
+    ):
+        yield 'comment', pk, post_id, created.isoformat(), '', text
+
+
+def export_rows(author):
+    ''' Посты и комментарии автора строками HEADER, архивные — перед
+    горячими.
+
+    Берём только нужные колонки через values_list и читаем курсором
+    порциями по CHUNK_SIZE, так что память не зависит от объёма данных.
+    '''
+    for model in (ArchivedPost, Post):
+        yield from post_rows(model, author)
+    for model in (ArchivedComment, Comment):
+        yield from comment_rows(model, author)
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(HEADER)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_jsonl(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(HEADER, row)), ensure_ascii=False) + '\n'
+
+
+EXPORT_FORMATS = {
+    'csv': (stream_csv, 'text/csv'),
+    'jsonl': (stream_jsonl, 'application/x-ndjson'),
+}
+
+
+def export_author(author, fmt):
+    ''' Генератор строк выгрузки автора в формате fmt. '''
+    stream, _ = EXPORT_FORMATS[fmt]
+    return stream(export_rows(author))
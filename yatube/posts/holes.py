@@ -0,0 +1,35 @@
+from django.template.loader import render_to_string
+
+from core.pagecache import register_hole
+
+from .models import Follow
+from .recommendations import recommendations_for
+
+
+@register_hole('switcher')
+def switcher(request):
+    return render_to_string('posts/includes/switcher.html', {}, request)
+
+
+@register_hole('follow_button')
+def follow_button(request, username):
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user, author__username=username
+    ).exists()
+    return render_to_string(
+        'posts/includes/follow_button.html',
+        {'username': username, 'following': following},
+        request,
+    )
+
+
+@register_hole('who_to_follow')
+def who_to_follow(request, username):
+    ''' Рекомендации видит только хозяин профиля. '''
+    if request.user.username != username:
+        return ''
+    return render_to_string(
+        'posts/includes/who_to_follow.html',
+        {'recommendations': recommendations_for(request.user)},
+        request,
+    )
@@ -0,0 +1,111 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .models import (ArchivedComment, ArchivedPost, Comment, GroupStats, Post,
+                     TrendingPost)
+
+
+class HotColdList:
+    ''' Последовательность «сначала горячие посты, потом архив».
+
+    Архив всегда старше горячей таблицы (archive_posts переносит самые
+    старые посты, import_posts кладёт в архив только посты старше
+    горячих), поэтому склейка двух выборок,
+    отсортированных по -pub_date, сохраняет порядок. Страницы в начале
+    читают только горячую таблицу, глубокие — только архив.
+    '''
+    ordered = True
+
+    def __init__(self, hot, cold):
+        self.hot = hot
+        self.cold = cold
+
+    @cached_property
+    def hot_count(self):
+        return self.hot.count()
+
+    @cached_property
+    def total(self):
+        return self.hot_count + self.cold.count()
+
+    def count(self):
+        return self.total
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        if stop is None:
+            stop = self.total
+        items = []
+        if start < self.hot_count:
+            items += list(self.hot[start:min(stop, self.hot_count)])
+        if stop > self.hot_count:
+            items += list(self.cold[
+                max(start - self.hot_count, 0):stop - self.hot_count
+            ])
+        return items
+
+
+def cutoff(days=None):
+    days = settings.ARCHIVE_AFTER_DAYS if days is None else days
+    return timezone.now() - timedelta(days=days)
+
+
+def delete_rows(table, column, ids):
+    ''' DELETE без ORM: перенос в архив не должен дёргать сигналы
+    удаления поста (счётчики групп и месяцев архив не меняет). '''
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE {column} IN ({placeholders})', ids
+        )
+
+
+def archive_batch(before, batch_size):
+    ''' Переносит до batch_size самых старых постов до before в архив
+    одной транзакцией. Возвращает число перенесённых постов. '''
+    with transaction.atomic():
+        posts = list(
+            Post.objects.filter(pub_date__lt=before)
+            .order_by('pub_date')[:batch_size]
+        )
+        if not posts:
+            return 0
+        ids = [post.pk for post in posts]
+        comments = list(Comment.objects.filter(post_id__in=ids))
+        GroupStats.objects.filter(last_post__in=ids).update(last_post=None)
+        TrendingPost.objects.filter(post__in=ids).delete()
+        # Сначала удаление: триггер FTS убирает строку индекса поста,
+        # и триггер архива добавляет её обратно под тем же id.
+        delete_rows(Comment._meta.db_table, 'post_id', ids)
+        delete_rows(Post._meta.db_table, 'id', ids)
+        ArchivedPost.objects.bulk_create(
+            ArchivedPost(
+                id=post.pk,
+                text=post.text,
+                pub_date=post.pub_date,
+                author_id=post.author_id,
+                group_id=post.group_id,
+                image=post.image.name,
+            )
+            for post in posts
+        )
+        ArchivedComment.objects.bulk_create(
+            ArchivedComment(
+                id=comment.pk,
+                post_id=comment.post_id,
+                author_id=comment.author_id,
+                text=comment.text,
+                created=comment.created,
+            )
+            for comment in comments
+        )
+    return len(ids)
@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts.hotcold import archive_batch, cutoff
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит посты старше --days дней с комментариями в архивные '
+        'таблицы, чтобы горячая posts_post и её индексы оставались '
+        'маленькими.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.ARCHIVE_AFTER_DAYS
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.ARCHIVE_BATCH
+        )
+
+    def handle(self, *args, **options):
+        before = cutoff(options['days'])
+        started = time.monotonic()
+        total = 0
+        while True:
+            moved = archive_batch(before, options['batch_size'])
+            if not moved:
+                break
+            total += moved
+            self.stdout.write(f'Перенесено постов: {total}')
+        if total:
+            # Оценка строк для EstimatedCountPaginator в админке.
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE posts_post')
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {total} постов за {time.monotonic() - started:.1f} с'
+        ))
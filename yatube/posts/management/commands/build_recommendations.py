@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.recommendations import rebuild_all, refresh_stale
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рекомендации «кого читать» по подпискам друзей. '
+        'По умолчанию только для пользователей с изменившимися подписками.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать всех по полному графу подписок.',
+        )
+        parser.add_argument(
+            '--top', type=int, help='Сколько авторов хранить на пользователя.'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['full']:
+            count = rebuild_all(options['top'])
+        else:
+            count = refresh_stale(options['top'])
+        self.stdout.write(
+            f'Пересчитано пользователей: {count} '
+            f'за {time.monotonic() - started:.1f} с'
+        )
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.exports import EXPORT_FORMATS, export_author
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Потоковая выгрузка постов и комментариев пользователя.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            '--format', choices=tuple(EXPORT_FORMATS), default='csv'
+        )
+        parser.add_argument(
+            '--output', help='Файл выгрузки (по умолчанию stdout).'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            author = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден'
+            )
+        chunks = export_author(author, options['format'])
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(
+            options['output'], 'w', newline='', encoding='utf-8'
+        ) as target:
+            target.writelines(chunks)
@@ -0,0 +1,376 @@
+import csv
+import itertools
+import json
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts.hotcold import cutoff
+from posts.models import (ArchivedComment, ArchivedPost, Comment, Group,
+                          ImportedPost, Post, User)
+from posts.stats import (add_monthly_counts, month_buckets,
+                         refresh_group_stats)
+
+FORMATS = ('jsonl', 'csv')
+
+
+class LookupMap:
+    ''' Кэш natural key -> id, дозагружаемый одним запросом на пачку.
+
+    Растёт только с числом различных авторов и групп, а не строк файла.
+    '''
+
+    def __init__(self, queryset, field):
+        self.queryset = queryset
+        self.field = field
+        self.ids = {}
+
+    def load(self, keys):
+        missing = {key for key in keys if key and key not in self.ids}
+        if missing:
+            self.ids.update(
+                self.queryset.filter(**{f'{self.field}__in': missing})
+                .values_list(self.field, 'id')
+            )
+            for key in missing:
+                self.ids.setdefault(key, None)
+
+    def get(self, key):
+        return self.ids.get(key)
+
+
+@contextmanager
+def keep_dates(*fields):
+    ''' Отключает auto_now_add, чтобы сохранить даты из исходника. '''
+    saved = [field.auto_now_add for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in zip(fields, saved):
+            field.auto_now_add = value
+
+
+def read_records(path, fmt):
+    ''' Построчно отдаёт записи файла, не загружая его целиком. '''
+    with open(path, newline='', encoding='utf-8') as source:
+        if fmt == 'csv':
+            yield from csv.DictReader(source)
+            return
+        for line in source:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоковый импорт постов и комментариев из JSONL или CSV. '
+        'Пост может нести source_id — свой id в исходной системе; '
+        'комментарий отдельной строкой ссылается на пост через '
+        'post_source_id (или post — id поста у нас), в том числе '
+        'архивный; уже импортированные комментарии пропускаются. Посты '
+        'должны идти в файле раньше своих комментариев. Старые посты '
+        'сразу попадают в архив, чтобы не нарушать порядок HotColdList.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--source', default='import',
+            help='Имя исходной системы: source_id уникальны в её пределах.',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл с числом уже импортированных записей '
+                 '(по умолчанию <path>.checkpoint).',
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить с записи, сохранённой в checkpoint.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'Файл {path} не найден')
+        fmt = options['format'] or os.path.splitext(path)[1].lstrip('.')
+        if fmt not in FORMATS:
+            raise CommandError(f'Неизвестный формат: {fmt}')
+        self.batch_size = options['batch_size']
+        self.source = options['source']
+        self.checkpoint = options['checkpoint'] or f'{path}.checkpoint'
+        self.authors = LookupMap(User.objects.all(), 'username')
+        self.groups = LookupMap(Group.objects.all(), 'slug')
+        self.skipped = 0
+        self.touched_groups = set()
+
+        done = self.read_checkpoint() if options['resume'] else 0
+        records = itertools.islice(read_records(path, fmt), done, None)
+        started = time.monotonic()
+        imported = 0
+        with keep_dates(
+            Post._meta.get_field('pub_date'),
+            Comment._meta.get_field('created'),
+        ):
+            while True:
+                chunk = list(itertools.islice(records, self.batch_size))
+                if not chunk:
+                    break
+                imported += self.import_chunk(chunk)
+                done += len(chunk)
+                self.write_checkpoint(done)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'{done} записей, {imported} строк, '
+                    f'{imported / elapsed:.0f} строк/с'
+                )
+        # bulk_create не шлёт сигналы, статистику групп досчитываем здесь.
+        refresh_group_stats(self.touched_groups)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {imported} строк, пропущено записей: {self.skipped}'
+        ))
+
+    def import_chunk(self, chunk):
+        ''' Пишет пачку записей одной транзакцией, возвращает число строк. '''
+        comments = [
+            comment for record in chunk
+            for comment in record.get('comments') or ()
+        ]
+        self.authors.load(
+            [record.get('author') for record in chunk]
+            + [comment.get('author') for comment in comments]
+        )
+        self.groups.load([record.get('group') for record in chunk])
+        source_ids = dict(ImportedPost.objects.filter(
+            source=self.source,
+            source_id__in={
+                str(record.get('source_id') or record.get('post_source_id'))
+                for record in chunk
+                if record.get('source_id') or record.get('post_source_id')
+            },
+        ).values_list('source_id', 'post_id'))
+        with transaction.atomic():
+            self.lock_for_write()
+            next_id = self.next_id(Post, ArchivedPost)
+            next_comment_id = self.next_id(Comment, ArchivedComment)
+            archive_before = self.archive_before()
+            posts, new_comments, imported = [], [], []
+            cold_posts, cold_comments, flat = [], [], []
+            months = Counter()
+            for record in chunk:
+                author_id = self.authors.get(record.get('author'))
+                source_id = str(record.get('source_id') or '')
+                if (
+                    author_id is None or not record.get('text')
+                    or source_id in source_ids
+                ):
+                    self.skipped += 1
+                    continue
+                if record.get('post') or record.get('post_source_id'):
+                    flat.append((
+                        record, author_id,
+                        self.comment_post(record, source_ids),
+                    ))
+                    continue
+                pub_date = self.parse_date(record.get('pub_date'))
+                cold = pub_date < archive_before
+                post = (ArchivedPost if cold else Post)(
+                    pk=next_id,
+                    author_id=author_id,
+                    group_id=self.groups.get(record.get('group')),
+                    text=record['text'],
+                    pub_date=pub_date,
+                )
+                next_id += 1
+                (cold_posts if cold else posts).append(post)
+                if source_id:
+                    source_ids[source_id] = post.pk
+                    imported.append(ImportedPost(
+                        source=self.source, source_id=source_id,
+                        post_id=post.pk,
+                    ))
+                if post.group_id:
+                    self.touched_groups.add(post.group_id)
+                months.update(month_buckets(
+                    post.group_id, post.author_id, post.pub_date
+                ))
+                if cold:
+                    comments = self.nested_comments(
+                        record, post.pk, ArchivedComment, next_comment_id
+                    )
+                    next_comment_id += len(comments)
+                    cold_comments += comments
+                else:
+                    new_comments += self.nested_comments(record, post.pk)
+            # Размер пачки INSERT выбирает бэкенд: SQLite ограничивает
+            # число строк в одном составном SELECT.
+            Post.objects.bulk_create(posts)
+            ArchivedPost.objects.bulk_create(cold_posts)
+            hot, cold = self.flat_comments(flat, next_comment_id)
+            new_comments += hot
+            cold_comments += cold
+            next_comment_id += len(cold)
+            # id архивных строк выданы вручную: AUTOINCREMENT горячих
+            # таблиц не должен выдать их повторно.
+            self.reserve_ids(Post, next_id - 1)
+            self.reserve_ids(Comment, next_comment_id - 1)
+            Comment.objects.bulk_create(new_comments)
+            ArchivedComment.objects.bulk_create(cold_comments)
+            ImportedPost.objects.bulk_create(imported)
+            add_monthly_counts(months)
+        return (
+            len(posts) + len(cold_posts)
+            + len(new_comments) + len(cold_comments)
+        )
+
+    def nested_comments(self, record, post_id, model=Comment, next_id=None):
+        ''' Комментарии из поля comments записи поста. Архивным выдаются
+        id подряд с next_id, горячим id назначит база. '''
+        comments = []
+        for comment in record.get('comments') or ():
+            author_id = self.authors.get(comment.get('author'))
+            if author_id is None or not comment.get('text'):
+                continue
+            pk = None if next_id is None else next_id + len(comments)
+            comments.append(self.build_comment(
+                comment, post_id, author_id, model, pk
+            ))
+        return comments
+
+    @staticmethod
+    def next_id(*models):
+        ''' Первый id, свободный и в горячей таблице, и в архиве: архив
+        хранит исходные id, а post_detail ищет по ним в обеих. '''
+        return max(
+            model.objects.aggregate(last=Max('pk'))['last'] or 0
+            for model in models
+        ) + 1
+
+    @staticmethod
+    def archive_before():
+        ''' Посты старше этой даты импортируются сразу в архив.
+
+        HotColdList и курсоры API считают, что весь архив старше всей
+        горячей таблицы, поэтому граница — не позже самого старого
+        горячего поста.
+        '''
+        oldest = Post.objects.aggregate(first=Min('pub_date'))['first']
+        return min(cutoff(), oldest) if oldest else cutoff()
+
+    @staticmethod
+    def reserve_ids(model, last):
+        ''' Сдвигает счётчик AUTOINCREMENT таблицы model до last. '''
+        table = model._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE sqlite_sequence SET seq = MAX(seq, %s) '
+                'WHERE name = %s', [last, table],
+            )
+            if not cursor.rowcount:
+                cursor.execute(
+                    'INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)',
+                    [table, last],
+                )
+
+    def flat_comments(self, flat, next_id):
+        ''' Комментарии отдельными строками: [(запись, автор, id поста)].
+
+        Возвращает (горячие, архивные). Пропускаются строки без поста
+        и уже импортированные: тот же пост, автор и текст, а если
+        в строке есть created — то и та же дата. Так повторный прогон
+        файла или прогон после сбоя до записи checkpoint не удваивает
+        комментарии.
+        '''
+        post_ids = {post_id for _, _, post_id in flat if post_id}
+        hot_posts = set(Post.objects.filter(
+            pk__in=post_ids
+        ).values_list('pk', flat=True))
+        cold_posts = set(ArchivedPost.objects.filter(
+            pk__in=post_ids - hot_posts
+        ).values_list('pk', flat=True))
+        known = hot_posts | cold_posts
+        seen = set()
+        for model in (Comment, ArchivedComment):
+            for post_id, author_id, text, created in model.objects.filter(
+                post_id__in=post_ids
+            ).values_list('post_id', 'author_id', 'text', 'created'):
+                seen.update((
+                    (post_id, author_id, text, None),
+                    (post_id, author_id, text, created),
+                ))
+        hot, cold = [], []
+        for record, author_id, post_id in flat:
+            created = record.get('created') and parse_datetime(
+                record['created']
+            )
+            key = (post_id, author_id, record['text'], created or None)
+            if key in seen or post_id not in known:
+                self.skipped += 1
+                continue
+            seen.update((key, key[:3] + (None,)))
+            if post_id in hot_posts:
+                hot.append(self.build_comment(record, post_id, author_id))
+            else:
+                cold.append(self.build_comment(
+                    record, post_id, author_id, ArchivedComment,
+                    next_id + len(cold),
+                ))
+        return hot, cold
+
+    @staticmethod
+    def comment_post(record, source_ids):
+        ''' id нашего поста для комментария-строки или None. '''
+        if record.get('post_source_id'):
+            return source_ids.get(str(record['post_source_id']))
+        try:
+            return int(record['post'])
+        except ValueError:
+            return None
+
+    def build_comment(self, record, post_id, author_id, model=Comment,
+                      pk=None):
+        return model(
+            pk=pk,
+            post_id=post_id,
+            author_id=author_id,
+            text=record['text'],
+            created=self.parse_date(record.get('created')),
+        )
+
+    @staticmethod
+    def parse_date(value):
+        return (value and parse_datetime(value)) or timezone.now()
+
+    @staticmethod
+    def lock_for_write():
+        ''' Берёт блокировку записи SQLite до чтения MAX(id).
+
+        Иначе между чтением и вставкой другой писатель может занять
+        те же id, которые мы раздаём постам пачки вручную.
+        '''
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE posts_post SET id = id WHERE 0')
+
+    def read_checkpoint(self):
+        try:
+            with open(self.checkpoint) as source:
+                return json.load(source)['records']
+        except FileNotFoundError:
+            return 0
+
+    def write_checkpoint(self, records):
+        tmp = f'{self.checkpoint}.tmp'
+        with open(tmp, 'w') as target:
+            json.dump({'records': records}, target)
+        os.replace(tmp, self.checkpoint)
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.trending import update_trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Досчитывает рейтинг «Популярное» по новым комментариям. '
+        'Запускайте периодически, одним экземпляром.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не выходить, а обновлять каждые --interval секунд.',
+        )
+        parser.add_argument('--interval', type=float, default=60.0)
+
+    def handle(self, *args, **options):
+        while True:
+            processed = update_trending(options['batch_size'])
+            if processed:
+                self.stdout.write(f'Учтено комментариев: {processed}')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,38 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:45
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicates(apps, schema_editor):
+    ''' Оставляет по одной подписке на пару (user, author). '''
+    Follow = apps.get_model('posts', 'Follow')
+    db = schema_editor.connection.alias
+    duplicates = (
+        Follow.objects.using(db)
+        .order_by()
+        .values('user', 'author')
+        .annotate(first=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for row in duplicates:
+        Follow.objects.using(db).filter(
+            user=row['user'], author=row['author']
+        ).exclude(id=row['first']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_date_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(
+                fields=('user', 'author'), name='unique_follow'
+            ),
+        ),
+    ]
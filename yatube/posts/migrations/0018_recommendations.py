@@ -0,0 +1,81 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Подписка или отписка меняет рекомендации самого пользователя и всех,
+# кто подписан на него (для них он — «друг»). Таблица posts_follow
+# пересоздаётся при AlterField/AddConstraint на SQLite, и триггеры при
+# этом пропадают: такие миграции должны создавать их заново.
+MARK_STALE = (
+    "INSERT OR REPLACE INTO posts_stalerecommendation (user_id, marked) "
+    "SELECT {row}.user_id, strftime('%Y-%m-%d %H:%M:%f', 'now') "
+    "UNION SELECT user_id, strftime('%Y-%m-%d %H:%M:%f', 'now') "
+    "FROM posts_follow WHERE author_id = {row}.user_id; "
+)
+
+CREATE_SQL = (
+    "CREATE TRIGGER IF NOT EXISTS posts_follow_stale_ai "
+    "AFTER INSERT ON posts_follow BEGIN "
+    + MARK_STALE.format(row='new')
+    + "END",
+    "CREATE TRIGGER IF NOT EXISTS posts_follow_stale_ad "
+    "AFTER DELETE ON posts_follow BEGIN "
+    + MARK_STALE.format(row='old')
+    + "END",
+    "INSERT OR IGNORE INTO posts_stalerecommendation (user_id, marked) "
+    "SELECT DISTINCT user_id, strftime('%Y-%m-%d %H:%M:%f', 'now') "
+    "FROM posts_follow",
+)
+
+DROP_SQL = (
+    "DROP TRIGGER IF EXISTS posts_follow_stale_ad",
+    "DROP TRIGGER IF EXISTS posts_follow_stale_ai",
+)
+
+
+def run_sqlite(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0017_follow_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaleRecommendation',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('marked', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Recommendation',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveIntegerField(verbose_name='Общих подписок')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Рекомендуемый автор')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='recommendation',
+            index=models.Index(fields=['user', '-score'], name='recommendation_user_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='recommendation',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_recommendation'),
+        ),
+        migrations.RunPython(run_sqlite(CREATE_SQL), run_sqlite(DROP_SQL)),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_stats(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    GroupStats = apps.get_model('posts', 'GroupStats')
+    db = schema_editor.connection.alias
+    rows = []
+    for group in Group.objects.using(db).iterator():
+        posts = group.posts.using(db).order_by('-pub_date', '-pk')
+        last = posts.first()
+        rows.append(GroupStats(
+            group=group,
+            post_count=posts.count(),
+            last_post=last,
+            last_post_at=last.pub_date if last else None,
+            last_post_text=last.text[:100] if last else '',
+        ))
+    GroupStats.objects.using(db).bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_trending'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.Group')),
+                ('post_count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+                ('last_post_at', models.DateTimeField(null=True, verbose_name='Последняя запись')),
+                ('last_post_text', models.CharField(blank=True, max_length=100)),
+                ('last_post', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='posts.Post')),
+            ],
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:05
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_counts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    MonthlyPostCount = apps.get_model('posts', 'MonthlyPostCount')
+    db = schema_editor.connection.alias
+    counts = Counter()
+    posts = Post.objects.using(db).order_by().values_list(
+        'group_id', 'author_id', 'pub_date'
+    )
+    for group_id, author_id, pub_date in posts.iterator():
+        month = timezone.localtime(pub_date).date().replace(day=1)
+        counts['site', 0, month] += 1
+        counts['author', author_id, month] += 1
+        if group_id:
+            counts['group', group_id, month] += 1
+    MonthlyPostCount.objects.using(db).bulk_create(
+        MonthlyPostCount(scope=scope, scope_id=scope_id, month=month,
+                         count=count)
+        for (scope, scope_id, month), count in counts.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_group_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyPostCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('site', 'Сайт'), ('group', 'Группа'), ('author', 'Автор')], max_length=6)),
+                ('scope_id', models.PositiveIntegerField(default=0)),
+                ('month', models.DateField(verbose_name='Месяц')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', 'pub_date'], name='post_group_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'pub_date'], name='post_author_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='monthlypostcount',
+            constraint=models.UniqueConstraint(fields=('scope', 'scope_id', 'month'), name='unique_month_bucket'),
+        ),
+        migrations.RunPython(fill_counts, migrations.RunPython.noop),
+    ]
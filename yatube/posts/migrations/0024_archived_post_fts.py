@@ -0,0 +1,50 @@
+from django.db import migrations
+
+# Архивные посты остаются в индексе posts_post_fts под своими id:
+# текст для FTS5 'delete' берётся из posts_archivedpost.
+CREATE_SQL = (
+    "CREATE TRIGGER IF NOT EXISTS posts_archivedpost_fts_ai "
+    "AFTER INSERT ON posts_archivedpost BEGIN "
+    "INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS posts_archivedpost_fts_ad "
+    "AFTER DELETE ON posts_archivedpost BEGIN "
+    "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS posts_archivedpost_fts_au "
+    "AFTER UPDATE OF text ON posts_archivedpost BEGIN "
+    "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text); "
+    "END",
+    "INSERT INTO posts_post_fts(rowid, text) "
+    "SELECT id, text FROM posts_archivedpost",
+)
+
+DROP_SQL = (
+    "DROP TRIGGER IF EXISTS posts_archivedpost_fts_au",
+    "DROP TRIGGER IF EXISTS posts_archivedpost_fts_ad",
+    "DROP TRIGGER IF EXISTS posts_archivedpost_fts_ai",
+    "INSERT INTO posts_post_fts(posts_post_fts) VALUES ('rebuild')",
+)
+
+
+def run_sqlite(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0023_imported_posts'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sqlite(CREATE_SQL), run_sqlite(DROP_SQL)),
+    ]
@@ -0,0 +1,51 @@
+from importlib import import_module
+
+from django.db import migrations
+
+# Триггер помечает только того, кто подписался или отписался: пометка
+# его подписчиков шла бы строкой на каждого внутри транзакции запроса.
+# Подписчиков добавляет refresh_stale, уже в фоне.
+MARK_STALE = (
+    "INSERT OR REPLACE INTO posts_stalerecommendation (user_id, marked) "
+    "VALUES ({row}.user_id, strftime('%Y-%m-%d %H:%M:%f', 'now')); "
+)
+
+CREATE_SQL = (
+    "DROP TRIGGER IF EXISTS posts_follow_stale_ad",
+    "DROP TRIGGER IF EXISTS posts_follow_stale_ai",
+    "CREATE TRIGGER IF NOT EXISTS posts_follow_stale_ai "
+    "AFTER INSERT ON posts_follow BEGIN "
+    + MARK_STALE.format(row='new')
+    + "END",
+    "CREATE TRIGGER IF NOT EXISTS posts_follow_stale_ad "
+    "AFTER DELETE ON posts_follow BEGIN "
+    + MARK_STALE.format(row='old')
+    + "END",
+)
+
+
+def run_sqlite(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+def restore_old_triggers(apps, schema_editor):
+    previous = import_module('posts.migrations.0018_recommendations')
+    run_sqlite(
+        previous.DROP_SQL + previous.CREATE_SQL[:2]
+    )(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0024_archived_post_fts'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sqlite(CREATE_SQL), restore_old_triggers),
+    ]
@@ -2,6 +2,8 @@ from django.contrib.auth import get_user_model
 from django.core.validators import MinLengthValidator
 from django.db import models
 
+from core.purge import purge, purge_enabled
+
 User = get_user_model()
 
 
@@ -24,6 +26,20 @@ class Group(models.Model):
         return f'Записи сообщества {self.title}'
 
 
+class PostManager(models.Manager):
+    def get_or_archived(self, **kwargs):
+        ''' Пост из горячей таблицы, а если его там нет — из архива.
+
+        Не найден нигде — ArchivedPost.DoesNotExist.
+        '''
+        try:
+            return self.get(**kwargs)
+        except self.model.DoesNotExist:
+            return ArchivedPost.objects.select_related(
+                'author', 'group'
+            ).get(**kwargs)
+
+
 class Post(models.Model):
     text = models.TextField(
         'Текст',
@@ -57,13 +73,68 @@ class Post(models.Model):
         blank=True
     )
 
+    objects = PostManager()
+
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(fields=('pub_date',), name='post_pub_date_idx'),
+            models.Index(
+                fields=('group', 'pub_date'), name='post_group_date_idx'
+            ),
+            models.Index(
+                fields=('author', 'pub_date'), name='post_author_date_idx'
+            ),
+        )
 
     def __str__(self) -> str:
         return f'{self.text[:15]}'
 
 
+class GroupStats(models.Model):
+    ''' Счётчики группы для каталога, ведутся сигналами Post. '''
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    post_count = models.PositiveIntegerField('Постов', default=0)
+    last_post = models.ForeignKey(
+        Post,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+',
+    )
+    last_post_at = models.DateTimeField('Последняя запись', null=True)
+    last_post_text = models.CharField(max_length=100, blank=True)
+
+
+class MonthlyPostCount(models.Model):
+    ''' Число постов за месяц для архива сайта, группы или автора. '''
+    SITE = 'site'
+    GROUP = 'group'
+    AUTHOR = 'author'
+    SCOPES = (
+        (SITE, 'Сайт'),
+        (GROUP, 'Группа'),
+        (AUTHOR, 'Автор'),
+    )
+
+    scope = models.CharField(max_length=6, choices=SCOPES)
+    scope_id = models.PositiveIntegerField(default=0)
+    month = models.DateField('Месяц')
+    count = models.PositiveIntegerField('Постов', default=0)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('scope', 'scope_id', 'month'),
+                name='unique_month_bucket',
+            ),
+        )
+
+
 class Comment(models.Model):
     post = models.ForeignKey(
         Post,
@@ -84,6 +155,47 @@ class Comment(models.Model):
         help_text='Дата создания поста',
     )
 
+    class Meta:
+        indexes = (
+            models.Index(fields=('created',), name='comment_created_idx'),
+        )
+
+
+def purge_authors(author_ids):
+    ''' Сбрасывает на прокси страницы авторов. '''
+    if purge_enabled():
+        purge(
+            f'author-{username}' for username in User.objects.filter(
+                pk__in=list(author_ids)
+            ).values_list('username', flat=True)
+        )
+
+
+class FollowQuerySet(models.QuerySet):
+    def follow(self, user_id, author_ids):
+        ''' Подписывает user_id на авторов одним INSERT OR IGNORE.
+
+        Повторная подписка и одновременные клики не создают дублей:
+        их отбрасывает уникальный индекс (user, author). На себя
+        подписаться нельзя.
+        '''
+        self.bulk_create(
+            [
+                Follow(user_id=user_id, author_id=author_id)
+                for author_id in set(author_ids) if author_id != user_id
+            ],
+            ignore_conflicts=True,
+        )
+        purge_authors(author_ids)
+
+    def unfollow(self, user_id, author_ids):
+        ''' Отписывает user_id от авторов одним DELETE. '''
+        deleted = self.filter(
+            user_id=user_id, author_id__in=list(author_ids)
+        ).delete()[0]
+        purge_authors(author_ids)
+        return deleted
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -99,5 +211,163 @@ class Follow(models.Model):
         verbose_name='Автор',
     )
 
+    objects = FollowQuerySet.as_manager()
+
     class Meta:
         ordering = ('author',)
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='unique_follow'
+            ),
+        )
+
+
+class Recommendation(models.Model):
+    ''' Предрасчитанная рекомендация автора (build_recommendations). '''
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommendations',
+        verbose_name='Пользователь',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Рекомендуемый автор',
+    )
+    score = models.PositiveIntegerField(
+        'Общих подписок',
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='unique_recommendation'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-score'), name='recommendation_user_idx'
+            ),
+        )
+
+
+class StaleRecommendation(models.Model):
+    ''' Пользователь, чьи рекомендации устарели.
+
+    Строки пишут триггеры SQLite на posts_follow при любой подписке
+    или отписке пользователя; его подписчиков добавляет refresh_stale.
+    '''
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+    )
+    marked = models.DateTimeField()
+
+
+class TrendingPost(models.Model):
+    ''' Пост в рейтинге «Популярное» (update_trending).
+
+    score — логарифм суммы exp(λ·t) по времени t комментариев. Общий
+    множитель затухания exp(-λ·now) на порядок не влияет, поэтому
+    старые строки не пересчитываются при каждом запуске.
+    '''
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+    )
+    score = models.FloatField()
+
+    class Meta:
+        indexes = (
+            models.Index(fields=('-score', '-post'), name='trending_idx'),
+        )
+
+
+class TrendingState(models.Model):
+    ''' Последний учтённый комментарий рейтинга «Популярное». '''
+    last_comment_id = models.PositiveIntegerField(default=0)
+    updated = models.DateTimeField(null=True)
+
+
+class ImportedPost(models.Model):
+    ''' Соответствие id поста в исходной системе и id у нас.
+
+    Заполняет import_posts: по нему комментарии из отдельных строк
+    находят свой пост, а повторный импорт не создаёт дублей. post_id —
+    без внешнего ключа, потому что архивация удаляет посты в обход ORM.
+    '''
+    source = models.CharField(max_length=50)
+    source_id = models.CharField(max_length=100)
+    post_id = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('source', 'source_id'), name='unique_import_source'
+            ),
+        )
+
+
+class ArchivedPost(models.Model):
+    ''' Холодная копия старого поста (archive_posts).
+
+    Поля и id те же, что у Post, поэтому шаблоны и ссылки работают
+    с ней без изменений; комментировать и редактировать её нельзя.
+    '''
+    is_archived = True
+
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField('Текст')
+    pub_date = models.DateTimeField('Дата')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts',
+        verbose_name='Автор',
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='archived_posts',
+        verbose_name='Группа',
+    )
+    image = models.ImageField('Картинка', upload_to='posts/', blank=True)
+
+    class Meta:
+        ordering = ('-pub_date',)
+        indexes = (
+            models.Index(fields=('pub_date',), name='archived_date_idx'),
+            models.Index(
+                fields=('group', 'pub_date'), name='archived_group_date_idx'
+            ),
+            models.Index(
+                fields=('author', 'pub_date'),
+                name='archived_author_date_idx',
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.text[:15]}'
+
+
+class ArchivedComment(models.Model):
+    id = models.IntegerField(primary_key=True)
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments',
+    )
+    text = models.TextField()
+    created = models.DateTimeField('Дата')
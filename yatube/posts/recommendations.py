@@ -0,0 +1,192 @@
+import heapq
+from array import array
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Follow, Recommendation, StaleRecommendation
+
+ID_CHUNK = 500
+
+
+class FollowGraph:
+    ''' Граф подписок в виде CSR: два массива целых вместо dict/set.
+
+    Подписки пользователя u — targets[offsets[u]:offsets[u + 1]],
+    отсортированные по id автора. Миллион рёбер занимает около 8 МБ.
+    '''
+
+    def __init__(self, edges):
+        self.offsets = array('q', [0])
+        self.targets = array('q')
+        for user_id, author_id in edges:
+            gap = user_id + 1 - len(self.offsets)
+            if gap > 0:
+                self.offsets.extend(array('q', [len(self.targets)]) * gap)
+            self.targets.append(author_id)
+        self.offsets.append(len(self.targets))
+
+    def following(self, user_id):
+        if user_id + 1 >= len(self.offsets):
+            return ()
+        return self.targets[self.offsets[user_id]:self.offsets[user_id + 1]]
+
+
+def follow_edges(user_ids=None):
+    ''' Рёбра (user_id, author_id) по возрастанию user_id. '''
+    edges = Follow.objects.order_by('user_id', 'author_id').values_list(
+        'user_id', 'author_id'
+    )
+    if user_ids is None:
+        yield from edges.iterator(chunk_size=settings.RECOMMENDATIONS_CHUNK)
+        return
+    user_ids = sorted(user_ids)
+    for start in range(0, len(user_ids), ID_CHUNK):
+        yield from edges.filter(
+            user_id__in=user_ids[start:start + ID_CHUNK]
+        )
+
+
+def load_graph(user_ids=None):
+    ''' Граф целиком или только то, что нужно для пользователей user_ids:
+    их подписки и подписки их авторов. '''
+    if user_ids is None:
+        return FollowGraph(follow_edges())
+    direct = FollowGraph(follow_edges(user_ids))
+    friends = set(direct.targets) | set(user_ids)
+    return FollowGraph(follow_edges(friends))
+
+
+def suggest(graph, user_id, limit):
+    ''' Топ авторов, на которых подписаны авторы пользователя.
+
+    Счёт — число общих подписок; при равенстве выше меньший id.
+    '''
+    following = graph.following(user_id)
+    known = set(following)
+    known.add(user_id)
+    scores = Counter()
+    for friend in following:
+        for author_id in graph.following(friend):
+            if author_id not in known:
+                scores[author_id] += 1
+    return heapq.nsmallest(
+        limit, scores.items(), key=lambda item: (-item[1], item[0])
+    )
+
+
+def save_recommendations(rows_by_user):
+    with transaction.atomic():
+        Recommendation.objects.filter(
+            user_id__in=list(rows_by_user)
+        ).delete()
+        Recommendation.objects.bulk_create(
+            [
+                Recommendation(user_id=user_id, author_id=author_id,
+                               score=score)
+                for user_id, rows in rows_by_user.items()
+                for author_id, score in rows
+            ],
+        )
+
+
+def build_recommendations(user_ids=None, limit=None):
+    ''' Пересчитывает рекомендации user_ids или всех подписчиков.
+
+    Возвращает число обработанных пользователей.
+    '''
+    limit = limit or settings.RECOMMENDATIONS_TOP
+    graph = load_graph(user_ids)
+    if user_ids is None:
+        Recommendation.objects.exclude(
+            user_id__in=Follow.objects.values('user_id')
+        ).delete()
+        user_ids = [
+            user_id for user_id in range(len(graph.offsets) - 1)
+            if graph.following(user_id)
+        ]
+    batch = {}
+    for user_id in user_ids:
+        batch[user_id] = suggest(graph, user_id, limit)
+        if len(batch) >= settings.RECOMMENDATIONS_CHUNK:
+            save_recommendations(batch)
+            batch = {}
+    if batch:
+        save_recommendations(batch)
+    return len(user_ids)
+
+
+def claim_stale(user_ids=None):
+    ''' Снимает отметки до пересчёта: подписка, случившаяся во время
+    пересчёта, поставит отметку заново и попадёт в следующий запуск. '''
+    stale = StaleRecommendation.objects.all()
+    if user_ids is None:
+        stale.delete()
+        return
+    for start in range(0, len(user_ids), ID_CHUNK):
+        stale.filter(user_id__in=user_ids[start:start + ID_CHUNK]).delete()
+
+
+def restore_stale(user_ids):
+    StaleRecommendation.objects.bulk_create(
+        [
+            StaleRecommendation(user_id=user_id, marked=timezone.now())
+            for user_id in user_ids
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def rebuild_all(limit=None):
+    ''' Полный пересчёт по всему графу. '''
+    stale = list(StaleRecommendation.objects.values_list('user', flat=True))
+    claim_stale()
+    try:
+        return build_recommendations(limit=limit)
+    except Exception:
+        restore_stale(stale)
+        raise
+
+
+def with_followers(user_ids):
+    ''' user_ids и их подписчики: для подписчиков они — «друзья». '''
+    result = set(user_ids)
+    for start in range(0, len(user_ids), ID_CHUNK):
+        result.update(Follow.objects.filter(
+            author_id__in=user_ids[start:start + ID_CHUNK]
+        ).values_list('user_id', flat=True))
+    return sorted(result)
+
+
+def refresh_stale(limit=None):
+    ''' Пересчитывает пользователей из StaleRecommendation и их
+    подписчиков: триггер помечает только самого подписавшегося.
+
+    Возвращает число обработанных пользователей.
+    '''
+    user_ids = list(
+        StaleRecommendation.objects.order_by('marked')
+        .values_list('user_id', flat=True)
+    )
+    if not user_ids:
+        return 0
+    claim_stale(user_ids)
+    try:
+        return build_recommendations(with_followers(user_ids), limit)
+    except Exception:
+        restore_stale(user_ids)
+        raise
+
+
+def recommendations_for(user, limit=None):
+    ''' Рекомендации для виджета одним запросом по индексу. '''
+    if not user.is_authenticated:
+        return []
+    limit = limit or settings.RECOMMENDATIONS_SHOWN
+    return list(
+        Recommendation.objects.filter(user=user)
+        .select_related('author')
+        .order_by('-score', 'author_id')[:limit]
+    )
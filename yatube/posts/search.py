@@ -0,0 +1,110 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import ArchivedPost, Post
+
+FTS_TABLE = 'posts_post_fts'
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# bm25() в FTS5 возвращает тем меньшее значение, чем лучше совпадение,
+# поэтому и сортировка, и курсор идут по возрастанию (score, rowid).
+SEARCH_SQL = (
+    f'SELECT rowid, bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+    f'WHERE {FTS_TABLE} MATCH %s {{keyset}}'
+    f'ORDER BY bm25({FTS_TABLE}), rowid LIMIT %s'
+)
+KEYSET_SQL = (
+    f'AND (bm25({FTS_TABLE}) > %s '
+    f'OR (bm25({FTS_TABLE}) = %s AND rowid > %s)) '
+)
+
+
+def build_match(query):
+    ''' Превращает пользовательский ввод в безопасное выражение MATCH.
+
+    Каждое слово берётся в кавычки, чтобы операторы FTS5 из запроса
+    не ломали синтаксис; последнее слово ищется по префиксу.
+    '''
+    tokens = TOKEN_RE.findall(query or '')
+    if not tokens:
+        return ''
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def encode_cursor(score, rowid):
+    return f'{score!r}:{rowid}'
+
+
+def decode_cursor(cursor):
+    ''' Возвращает (score, rowid) или None для битого курсора. '''
+    try:
+        score, rowid = cursor.split(':')
+        return float(score), int(rowid)
+    except (AttributeError, ValueError):
+        return None
+
+
+def match_ids(query, cursor=None, limit=None):
+    ''' Список (rowid, score) совпадений, упорядоченный по релевантности. '''
+    match = build_match(query)
+    if not match:
+        return []
+    params = [match]
+    keyset = ''
+    position = decode_cursor(cursor) if cursor else None
+    if position is not None:
+        score, rowid = position
+        keyset = KEYSET_SQL
+        params += [score, score, rowid]
+    params.append(-1 if limit is None else limit)
+    with connection.cursor() as db:
+        db.execute(SEARCH_SQL.format(keyset=keyset), params)
+        return db.fetchall()
+
+
+def filter_posts(queryset, query):
+    ''' Сужает queryset постов до совпадений с запросом одним подзапросом. '''
+    match = build_match(query)
+    if not match:
+        return queryset.none()
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        [match]
+    ))
+
+
+def search_posts(query, cursor=None, per_page=10):
+    ''' Страница результатов поиска и курсор следующей страницы.
+
+    Берём на одну строку больше, чтобы узнать, есть ли продолжение,
+    не считая общее число совпадений.
+    '''
+    rows = match_ids(query, cursor, per_page + 1)
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+    ids = [rowid for rowid, _ in rows]
+    posts = Post.objects.select_related('author', 'group').in_bulk(ids)
+    # Архивные посты остаются в индексе под своими id.
+    posts.update(ArchivedPost.objects.select_related(
+        'author', 'group'
+    ).in_bulk([pk for pk in ids if pk not in posts]))
+    return [posts[rowid] for rowid, _ in rows if rowid in posts], next_cursor
+
+
+def rebuild_index():
+    ''' Полностью перестраивает индекс по posts_post и архиву. '''
+    with connection.cursor() as db:
+        db.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+        )
+        db.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, text) '
+            f'SELECT id, text FROM {ArchivedPost._meta.db_table}'
+        )
@@ -0,0 +1,112 @@
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from core.pagecache import bump_tags
+from core.purge import purge
+
+from .models import ArchivedPost, Comment, Group, Post, User
+from .stats import (month_buckets, move_monthly_counts, post_added,
+                    post_edited, post_removed)
+
+
+STATE_FIELDS = ('group_id', 'author_id', 'pub_date')
+DEFERRED = object()
+
+
+def saved_state(post):
+    ''' (group_id, author_id, pub_date) без чтения отложенных полей:
+    чтение догрузило бы объект, снова вызвав post_init. Вместо них —
+    DEFERRED. '''
+    return tuple(post.__dict__.get(field, DEFERRED) for field in STATE_FIELDS)
+
+
+def drop_cached_pages(post_id, *states):
+    ''' Сбрасывает страницы поста, его групп и авторов в общем кэше и
+    на прокси. Второй сброс общего кэша после COMMIT убирает страницу,
+    которую успел закэшировать параллельный запрос до фиксации. '''
+    group_ids = {group_id for group_id, _, _ in states if group_id}
+    author_ids = {author_id for _, author_id, _ in states if author_id}
+    tags = [
+        f'group-{slug}' for slug in Group.objects.filter(
+            pk__in=group_ids
+        ).values_list('slug', flat=True)
+    ] + [
+        f'author-{username}' for username in User.objects.filter(
+            pk__in=author_ids
+        ).values_list('username', flat=True)
+    ]
+    bump_tags(tags)
+    transaction.on_commit(lambda: bump_tags(tags))
+    purge(tags + [f'post-{post_id}', 'index', 'groups', 'trending'])
+
+
+@receiver(post_init, sender=Post)
+def remember_state(sender, instance, **kwargs):
+    ''' Состояние на момент загрузки: по нему видно перенос поста. '''
+    instance._saved_state = saved_state(instance)
+
+
+@receiver((pre_save, pre_delete), sender=Post)
+def resolve_deferred_state(sender, instance, **kwargs):
+    ''' Отложенные поля ещё не менялись: берём их из базы до записи. '''
+    state = instance._saved_state
+    if DEFERRED not in state or instance.pk is None:
+        return
+    row = Post.objects.filter(pk=instance.pk).values_list(
+        *STATE_FIELDS
+    ).first() or (None, None, None)
+    instance._saved_state = tuple(
+        stored if value is DEFERRED else value
+        for value, stored in zip(state, row)
+    )
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_state = (None, None, None) if created else instance._saved_state
+    new_state = tuple(
+        old if new is DEFERRED else new
+        for old, new in zip(old_state, saved_state(instance))
+    )
+    old, new = old_state[0], new_state[0]
+    if old != new:
+        if old:
+            post_removed(old, instance.pk)
+        if new:
+            post_added(new, instance)
+    elif new:
+        post_edited(new, instance)
+    move_monthly_counts(
+        month_buckets(*old_state), month_buckets(*new_state)
+    )
+    drop_cached_pages(instance.pk, old_state, new_state)
+    instance._saved_state = new_state
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    group_id = instance._saved_state[0]
+    if group_id:
+        post_removed(group_id, instance.pk)
+    move_monthly_counts(old=month_buckets(*instance._saved_state))
+    drop_cached_pages(instance.pk, instance._saved_state)
+
+
+@receiver(post_delete, sender=ArchivedPost)
+def count_deleted_archived_post(sender, instance, **kwargs):
+    ''' Архивные записи тоже входят в счётчики групп и месяцев. '''
+    if instance.group_id:
+        post_removed(instance.group_id, instance.pk)
+    state = instance.group_id, instance.author_id, instance.pub_date
+    move_monthly_counts(old=month_buckets(*state))
+    drop_cached_pages(instance.pk, state)
+
+
+@receiver((post_save, post_delete), sender=Comment)
+def purge_commented_post(sender, instance, raw=False, **kwargs):
+    if not raw:
+        purge([f'post-{instance.post_id}'])
@@ -0,0 +1,139 @@
+from collections import Counter
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+from django.utils.text import Truncator
+
+from .models import ArchivedPost, Group, GroupStats, MonthlyPostCount, Post
+
+EXCERPT_LENGTH = 100
+
+
+def excerpt(post):
+    return Truncator(post.text).chars(EXCERPT_LENGTH)
+
+
+def refresh_group_stats(group_ids=None):
+    ''' Пересчитывает статистику групп с нуля.
+
+    Нужна после массовых операций мимо сигналов (bulk_create, update).
+    Архивные посты входят в счётчик, последний пост — всегда горячий.
+    '''
+    groups = Group.objects.all()
+    if group_ids is not None:
+        groups = groups.filter(pk__in=list(group_ids))
+    for group_id in groups.values_list('pk', flat=True).iterator():
+        posts = Post.objects.filter(group_id=group_id)
+        last = posts.order_by('-pub_date', '-pk').first()
+        GroupStats.objects.update_or_create(group_id=group_id, defaults={
+            'post_count': posts.count() + ArchivedPost.objects.filter(
+                group_id=group_id
+            ).count(),
+            'last_post': last,
+            'last_post_at': last.pub_date if last else None,
+            'last_post_text': excerpt(last) if last else '',
+        })
+
+
+def post_added(group_id, post):
+    ''' +1 к счётчику и, если пост новее, замена последней записи.
+    Один UPDATE; строки статистики ещё нет — пересчёт группы. '''
+    newer = Q(last_post_at__isnull=True) | Q(last_post_at__lte=post.pub_date)
+    updated = GroupStats.objects.filter(group_id=group_id).update(
+        post_count=F('post_count') + 1,
+        last_post=Case(
+            When(newer, then=Value(post.pk)),
+            default=F('last_post'),
+            output_field=models.IntegerField(),
+        ),
+        last_post_at=Case(
+            When(newer, then=Value(post.pub_date)),
+            default=F('last_post_at'),
+            output_field=models.DateTimeField(),
+        ),
+        last_post_text=Case(
+            When(newer, then=Value(excerpt(post))),
+            default=F('last_post_text'),
+            output_field=models.CharField(),
+        ),
+    )
+    if not updated:
+        refresh_group_stats([group_id])
+
+
+def post_removed(group_id, post_pk):
+    ''' −1 к счётчику; если ушла последняя запись, ищем новую. '''
+    stats = GroupStats.objects.filter(group_id=group_id)
+    stats.update(post_count=F('post_count') - 1)
+    if stats.filter(
+        Q(last_post=post_pk) | Q(last_post__isnull=True)
+    ).exists():
+        last = Post.objects.filter(group_id=group_id).exclude(
+            pk=post_pk
+        ).order_by('-pub_date', '-pk').first()
+        stats.update(
+            last_post=last,
+            last_post_at=last.pub_date if last else None,
+            last_post_text=excerpt(last) if last else '',
+        )
+
+
+def post_edited(group_id, post):
+    GroupStats.objects.filter(group_id=group_id, last_post=post).update(
+        last_post_text=excerpt(post)
+    )
+
+
+def month_of(moment):
+    ''' Первое число месяца moment в текущем часовом поясе. '''
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return timezone.localtime(moment).date().replace(day=1)
+
+
+def month_buckets(group_id, author_id, pub_date):
+    ''' Корзины архива, в которые попадает пост. '''
+    if pub_date is None:
+        return []
+    month = month_of(pub_date)
+    buckets = [
+        (MonthlyPostCount.SITE, 0, month),
+        (MonthlyPostCount.AUTHOR, author_id, month),
+    ]
+    if group_id:
+        buckets.append((MonthlyPostCount.GROUP, group_id, month))
+    return buckets
+
+
+def bump_month(scope, scope_id, month, delta):
+    rows = MonthlyPostCount.objects.filter(
+        scope=scope, scope_id=scope_id, month=month
+    )
+    if rows.update(count=F('count') + delta) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            MonthlyPostCount.objects.create(
+                scope=scope, scope_id=scope_id, month=month, count=delta
+            )
+    except IntegrityError:
+        rows.update(count=F('count') + delta)
+
+
+def move_monthly_counts(old=(), new=()):
+    ''' Переносит пост из корзин old в корзины new.
+
+    Совпадающие корзины взаимно гасятся, так что правка текста
+    не стоит ни одного запроса.
+    '''
+    deltas = Counter(new)
+    deltas.subtract(old)
+    add_monthly_counts(deltas)
+
+
+def add_monthly_counts(deltas):
+    ''' Применяет {(scope, scope_id, month): delta} к корзинам. '''
+    for (scope, scope_id, month), delta in deltas.items():
+        if delta:
+            bump_month(scope, scope_id, month, delta)
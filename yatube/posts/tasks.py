@@ -0,0 +1,43 @@
+from sorl.thumbnail import get_thumbnail
+
+from core.queue import task
+
+from .deletion import purge_group, purge_user
+from .models import Post
+
+# Геометрия миниатюр из шаблонов article.html и post_detail.html.
+THUMBNAILS = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+
+@task
+def make_thumbnails(post_id):
+    ''' Заранее нарезает миниатюры картинки поста. '''
+    post = Post.objects.filter(pk=post_id).only('image').first()
+    if post is None or not post.image:
+        return
+    for geometry, options in THUMBNAILS:
+        get_thumbnail(post.image, geometry, **options)
+
+
+@task
+def delete_user(user_id):
+    purge_user(user_id)
+
+
+@task
+def delete_group(group_id):
+    purge_group(group_id)
+
+
+def schedule_user_deletion(user):
+    ''' Сразу выключает пользователя (он разлогинивается и не входит
+    снова), а его записи удаляет в фоне пачками. '''
+    user.is_active = False
+    user.save(update_fields=('is_active',))
+    delete_user.delay(user.pk)
+
+
+def schedule_group_deletion(group):
+    delete_group.delay(group.pk)
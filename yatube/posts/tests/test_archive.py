@@ -0,0 +1,89 @@
+from datetime import date, timedelta
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Group, MonthlyPostCount, Post, User
+from ..stats import month_of
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def counts(self):
+        return dict(
+            ((scope, scope_id), count)
+            for scope, scope_id, count in MonthlyPostCount.objects.values_list(
+                'scope', 'scope_id', 'count'
+            )
+        )
+
+    def test_buckets_follow_posts(self):
+        ''' Корзины месяца меняются при создании, переносе и удалении. '''
+        post = Post.objects.create(
+            author=self.user, group=self.group, text='Пост'
+        )
+        self.assertEqual(self.counts(), {
+            ('site', 0): 1,
+            ('author', self.user.pk): 1,
+            ('group', self.group.pk): 1,
+        })
+        post.group = None
+        post.save()
+        self.assertEqual(self.counts()['group', self.group.pk], 0)
+        self.assertEqual(self.counts()['site', 0], 1)
+        post.delete()
+        self.assertEqual(set(self.counts().values()), {0})
+
+    def test_month_page_lists_only_that_month(self):
+        ''' Страница месяца показывает только его посты. '''
+        old = Post.objects.create(
+            author=self.user, group=self.group, text='Старый'
+        )
+        Post.objects.filter(pk=old.pk).update(
+            pub_date=timezone.now() - timedelta(days=40)
+        )
+        old.refresh_from_db()
+        Post.objects.create(author=self.user, group=self.group, text='Новый')
+        month = month_of(old.pub_date)
+        for url in (
+            reverse('posts:archive', args=[month.year, month.month]),
+            reverse('posts:group_archive',
+                    args=[self.group.slug, month.year, month.month]),
+            reverse('posts:profile_archive',
+                    args=[self.user.username, month.year, month.month]),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(list(response.context['page_obj']), [old])
+
+    def test_invalid_month(self):
+        ''' Несуществующий месяц — 404. '''
+        response = self.client.get(reverse('posts:archive', args=[2024, 13]))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_navigation_without_group_by(self):
+        ''' Меню архива строится из корзин, без GROUP BY по постам. '''
+        Post.objects.create(author=self.user, group=self.group, text='Пост')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:index'))
+        [(year, months)] = response.context['archive']
+        self.assertEqual(months[0]['month'], month_of(timezone.now()))
+        self.assertEqual(months[0]['count'], 1)
+        self.assertIsInstance(months[0]['month'], date)
+        self.assertFalse(
+            any('GROUP BY' in query['sql'] for query in queries)
+        )
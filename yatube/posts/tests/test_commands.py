@@ -0,0 +1,166 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import (ArchivedComment, ArchivedPost, Comment, Group,
+                      GroupStats, ImportedPost, Post)
+
+User = get_user_model()
+
+
+class ImportPostsCommandTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as target:
+            target.write(content)
+        return path
+
+    def test_import_jsonl_with_comments(self):
+        ''' Посты и вложенные комментарии импортируются пачками. '''
+        recent = timezone.now().replace(microsecond=0) - timedelta(days=10)
+        records = [
+            {
+                'author': 'auth',
+                'group': 'test-slug',
+                'text': f'Пост {i}',
+                'pub_date': (recent + timedelta(days=i)).isoformat(),
+                'comments': [{'author': 'reader', 'text': 'Комментарий'}],
+            }
+            for i in range(3)
+        ]
+        records.append({'author': 'nobody', 'text': 'Пропустим'})
+        path = self.write(
+            'posts.jsonl', '\n'.join(json.dumps(r) for r in records)
+        )
+        call_command('import_posts', path, batch_size=2, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertEqual(Comment.objects.count(), 3)
+        post = Post.objects.get(text='Пост 0')
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(post.pub_date, recent)
+        self.assertEqual(post.comments.get().author, self.reader)
+
+    def test_resume_from_checkpoint(self):
+        ''' С --resume уже импортированные записи пропускаются. '''
+        path = self.write(
+            'posts.csv',
+            'author,text,group\nauth,Первый,\nauth,Второй,test-slug\n',
+        )
+        with open(f'{path}.checkpoint', 'w') as checkpoint:
+            json.dump({'records': 1}, checkpoint)
+        call_command('import_posts', path, resume=True, stdout=StringIO())
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)), ['Второй']
+        )
+
+    def test_flat_comments_by_source_id(self):
+        ''' Комментарии CSV находят пост по его id в исходной системе. '''
+        path = self.write(
+            'posts.csv',
+            'author,text,source_id,post_source_id\n'
+            'auth,Первый,p-1,\n'
+            'reader,К первому,,p-1\n'
+            'auth,Второй,p-2,\n'
+            'reader,Ко второму,,p-2\n'
+            'reader,К неизвестному,,p-3\n',
+        )
+        call_command(
+            'import_posts', path, batch_size=2, source='old',
+            stdout=StringIO(),
+        )
+        for source_id, text in (('p-1', 'Первый'), ('p-2', 'Второй')):
+            post = Post.objects.get(pk=ImportedPost.objects.get(
+                source='old', source_id=source_id
+            ).post_id)
+            self.assertEqual(post.text, text)
+            self.assertEqual(post.comments.count(), 1)
+        self.assertEqual(Comment.objects.count(), 2)
+
+        comments = self.write(
+            'comments.csv',
+            'author,text,post_source_id\nauth,Позже,p-2\n',
+        )
+        call_command('import_posts', comments, source='old', stdout=StringIO())
+        call_command('import_posts', path, source='old', stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(
+            Comment.objects.filter(text='Позже').get().post.text, 'Второй'
+        )
+
+    def test_old_posts_go_to_archive(self):
+        ''' Посты старше горячей таблицы импортируются сразу в архив. '''
+        hot = Post.objects.create(author=self.user, text='Горячий')
+        path = self.write('posts.jsonl', '\n'.join(json.dumps(r) for r in (
+            {
+                'author': 'auth', 'group': 'test-slug', 'text': 'Старый',
+                'pub_date': '2020-01-01T10:00:00+00:00',
+                'comments': [{'author': 'reader', 'text': 'Давно'}],
+            },
+            {'author': 'auth', 'text': 'Свежий'},
+        )))
+        call_command('import_posts', path, stdout=StringIO())
+        archived = ArchivedPost.objects.get()
+        self.assertEqual(archived.text, 'Старый')
+        self.assertEqual(ArchivedComment.objects.get().post, archived)
+        self.assertEqual(
+            set(Post.objects.values_list('text', flat=True)),
+            {'Горячий', 'Свежий'},
+        )
+        self.assertEqual(GroupStats.objects.get().post_count, 1)
+        newer = Post.objects.create(author=self.user, text='Новый')
+        comment = Comment.objects.create(
+            post=hot, author=self.user, text='Новый'
+        )
+        self.assertGreater(newer.pk, archived.pk)
+        self.assertGreater(comment.pk, ArchivedComment.objects.get().pk)
+
+    def test_flat_comments_are_not_duplicated(self):
+        ''' Повторный прогон не удваивает комментарии, битый id поста
+        пропускается, комментарий к архивному посту уходит в архив. '''
+        post = Post.objects.create(author=self.user, text='Пост')
+        archived = ArchivedPost.objects.create(
+            pk=post.pk + 1, author=self.user, text='Архивный',
+            pub_date=timezone.now() - timedelta(days=400),
+        )
+        path = self.write(
+            'comments.csv',
+            'author,text,post,created\n'
+            f'reader,Первый,{post.pk},\n'
+            f'reader,Второй,{post.pk},2024-01-01T10:00:00+00:00\n'
+            f'reader,Старый,{archived.pk},\n'
+            'reader,Битый,abc,\n',
+        )
+        for _ in range(2):
+            out = StringIO()
+            call_command('import_posts', path, stdout=out)
+        self.assertIn('пропущено записей: 4', out.getvalue())
+        self.assertEqual(
+            sorted(post.comments.values_list('text', flat=True)),
+            ['Второй', 'Первый'],
+        )
+        self.assertEqual(
+            list(archived.comments.values_list('text', flat=True)),
+            ['Старый'],
+        )
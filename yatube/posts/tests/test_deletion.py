@@ -0,0 +1,137 @@
+import os
+import shutil
+import tempfile
+from http import HTTPStatus
+
+from django.conf import settings
+from django.contrib.auth.models import Permission
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Task
+from core.queue import run_pending
+
+from ..hotcold import archive_batch
+from ..models import (ArchivedComment, ArchivedPost, Comment, Follow, Group,
+                      GroupStats, MonthlyPostCount, Post, User)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT, DELETION_BATCH=2, DELETION_PAUSE=0
+)
+class BackgroundDeletionTests(TestCase):
+    databases = {'default', 'thumbnails'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@yatube.ru', password='pass'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.posts = [
+            Post.objects.create(
+                author=self.author, group=self.group, text=f'Пост {i}'
+            )
+            for i in range(5)
+        ]
+        self.pictured = Post.objects.create(
+            author=self.author,
+            text='С картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        for post in self.posts:
+            Comment.objects.create(
+                post=post, author=self.reader, text='Комментарий'
+            )
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.author, author=self.reader)
+        kept = Post.objects.create(author=self.reader, group=self.group,
+                                   text='Чужой пост')
+        Comment.objects.create(post=kept, author=self.author, text='Мой')
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def delete_in_admin(self, model, obj):
+        return self.client.post(
+            reverse(f'admin:{model}_delete', args=[obj.pk]),
+            {'post': 'yes'},
+        )
+
+    def test_admin_deletes_user_in_background(self):
+        ''' Админка выключает автора сразу, а записи удаляет задача. '''
+        image = os.path.join(TEMP_MEDIA_ROOT, self.pictured.image.name)
+        self.assertTrue(os.path.exists(image))
+        response = self.delete_in_admin('auth_user', self.author)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        self.author.refresh_from_db()
+        self.assertFalse(self.author.is_active)
+        self.assertEqual(Post.objects.filter(author=self.author).count(), 6)
+        self.assertEqual(Task.objects.count(), 1)
+
+        run_pending()
+        self.assertFalse(User.objects.filter(username='author').exists())
+        self.assertEqual(list(Post.objects.values_list('text', flat=True)),
+                         ['Чужой пост'])
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(os.path.exists(image))
+        self.assertEqual(GroupStats.objects.get().post_count, 1)
+        self.assertFalse(MonthlyPostCount.objects.filter(
+            scope=MonthlyPostCount.AUTHOR, scope_id=self.author.pk
+        ).exists())
+
+    def test_archived_posts_are_deleted_too(self):
+        ''' Архивные записи и их счётчики удаляются вместе с автором. '''
+        archive_batch(timezone.now(), 1)
+        self.assertEqual(ArchivedComment.objects.count(), 1)
+        self.delete_in_admin('auth_user', self.author)
+        run_pending()
+        self.assertFalse(ArchivedPost.objects.exists())
+        self.assertFalse(ArchivedComment.objects.exists())
+        site = MonthlyPostCount.objects.get(scope=MonthlyPostCount.SITE)
+        self.assertEqual(site.count, 1)
+
+    def test_related_delete_permissions_are_checked(self):
+        ''' Без права удалять посты автора с постами удалить нельзя. '''
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        staff.user_permissions.set(Permission.objects.filter(
+            codename__in=('view_user', 'delete_user')
+        ))
+        self.client.force_login(staff)
+        response = self.delete_in_admin('auth_user', self.author)
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        self.assertTrue(User.objects.get(pk=self.author.pk).is_active)
+        self.assertFalse(Task.objects.exists())
+
+    def test_admin_deletes_group_in_background(self):
+        ''' Записи группы остаются, но без группы. '''
+        self.delete_in_admin('posts_group', self.group)
+        self.assertTrue(Group.objects.exists())
+        run_pending()
+        self.assertFalse(Group.objects.exists())
+        self.assertEqual(Post.objects.count(), 7)
+        self.assertFalse(Post.objects.filter(group__isnull=False).exists())
+        self.assertFalse(MonthlyPostCount.objects.filter(
+            scope=MonthlyPostCount.GROUP
+        ).exists())
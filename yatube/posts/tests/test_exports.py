@@ -0,0 +1,66 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.other = User.objects.create_user(username='other')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+        Comment.objects.create(
+            post=cls.post, author=cls.user, text='Комментарий, с запятой'
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_export_streams_csv(self):
+        ''' Автор получает свою выгрузку потоком в CSV. '''
+        response = self.client.get(
+            reverse('posts:profile_export', args=[self.user.username])
+        )
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'type,id,post_id,date,group,text')
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[2].endswith('"Комментарий, с запятой"'))
+
+    def test_export_jsonl(self):
+        ''' Формат JSONL отдаёт по объекту на строку. '''
+        response = self.client.get(
+            reverse('posts:profile_export', args=[self.user.username]),
+            {'format': 'jsonl'},
+        )
+        rows = [
+            json.loads(line) for line in
+            b''.join(response.streaming_content).decode().splitlines()
+        ]
+        self.assertEqual([row['type'] for row in rows], ['post', 'comment'])
+        self.assertEqual(rows[0]['text'], self.post.text)
+
+    def test_foreign_export_redirects(self):
+        ''' Чужую выгрузку получить нельзя. '''
+        response = self.client.get(
+            reverse('posts:profile_export', args=[self.other.username])
+        )
+        self.assertRedirects(
+            response, reverse('posts:profile', args=[self.other.username])
+        )
+
+    def test_export_command(self):
+        ''' Команда export_user пишет ту же выгрузку в stdout. '''
+        out = StringIO()
+        call_command('export_user', 'auth', format='jsonl', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
@@ -13,6 +13,8 @@ TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostCreateForm(TestCase):
+    databases = {'default', 'thumbnails'}
+
     @classmethod
     def setUpClass(cls):
         ''' Создаём юзера и тестовые группы. '''
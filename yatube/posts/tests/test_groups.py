@@ -0,0 +1,142 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, GroupStats, MonthlyPostCount, Post, User
+from ..stats import refresh_group_stats
+from ..tasks import make_thumbnails
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C\x0A\x00\x3B'
+)
+
+
+class GroupStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Первая', slug='first', description='Описание'
+        )
+        cls.other = Group.objects.create(
+            title='Вторая', slug='second', description='Описание'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def stats(self, group):
+        return GroupStats.objects.get(group=group)
+
+    def test_signals_follow_create_move_and_delete(self):
+        ''' Счётчик и последняя запись следуют за изменениями постов. '''
+        first = Post.objects.create(
+            author=self.user, group=self.group, text='Первый'
+        )
+        second = Post.objects.create(
+            author=self.user, group=self.group, text='Второй'
+        )
+        self.assertEqual(self.stats(self.group).post_count, 2)
+        self.assertEqual(self.stats(self.group).last_post, second)
+
+        second.group = self.other
+        second.save()
+        self.assertEqual(self.stats(self.group).post_count, 1)
+        self.assertEqual(self.stats(self.group).last_post, first)
+        self.assertEqual(self.stats(self.other).last_post_text, 'Второй')
+
+        first.delete()
+        stats = self.stats(self.group)
+        self.assertEqual(stats.post_count, 0)
+        self.assertIsNone(stats.last_post)
+        self.assertIsNone(stats.last_post_at)
+
+    def test_refresh_matches_signals(self):
+        ''' Пересчёт с нуля даёт те же цифры, что и сигналы. '''
+        for text in ('Раз', 'Два', 'Три'):
+            Post.objects.create(author=self.user, group=self.group, text=text)
+        expected = self.stats(self.group)
+        GroupStats.objects.all().delete()
+        refresh_group_stats()
+        stats = self.stats(self.group)
+        self.assertEqual(stats.post_count, expected.post_count)
+        self.assertEqual(stats.last_post_id, expected.last_post_id)
+        self.assertEqual(self.stats(self.other).post_count, 0)
+
+    def test_directory_queries_do_not_grow(self):
+        ''' Каталог групп стоит одинаковое число запросов. '''
+        Post.objects.create(author=self.user, group=self.group, text='Пост')
+        url = reverse('posts:group_index')
+        with CaptureQueriesContext(connection) as few:
+            response = self.client.get(url)
+        self.assertContains(response, 'Записей: 1')
+        for number in range(10):
+            Group.objects.create(
+                title=f'Группа {number}', slug=f'group-{number}',
+                description='Описание',
+            )
+        cache.clear()
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(url)
+        self.assertEqual(len(many), len(few))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class DeferredPostTests(TestCase):
+    databases = {'default', 'thumbnails'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_thumbnails_for_post_with_image(self):
+        ''' Задача читает пост через only('image') и режет миниатюры. '''
+        post = Post.objects.create(
+            author=self.user,
+            text='С картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        make_thumbnails(post.pk)
+        self.assertTrue(os.path.isdir(os.path.join(TEMP_MEDIA_ROOT, 'cache')))
+
+    def test_deferred_save_and_delete_keep_counters(self):
+        ''' Отложенные поля не ломают счётчики групп и месяцев. '''
+        post = Post.objects.create(
+            author=self.user, group=self.group, text='Пост'
+        )
+        deferred = Post.objects.only('text').get(pk=post.pk)
+        deferred.text = 'Правка'
+        deferred.save()
+        self.assertEqual(GroupStats.objects.get().post_count, 1)
+        self.assertEqual(
+            MonthlyPostCount.objects.get(
+                scope=MonthlyPostCount.GROUP
+            ).count,
+            1,
+        )
+        Post.objects.only('text').get(pk=post.pk).delete()
+        self.assertEqual(GroupStats.objects.get().post_count, 0)
+        self.assertFalse(MonthlyPostCount.objects.filter(count__gt=0).exists())
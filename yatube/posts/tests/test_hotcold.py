@@ -0,0 +1,163 @@
+import json
+from datetime import timedelta
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..hotcold import HotColdList
+from ..search import rebuild_index, search_posts
+from ..stats import refresh_group_stats
+from ..models import (ArchivedComment, ArchivedPost, Comment, Follow, Group,
+                      GroupStats, MonthlyPostCount, Post, User)
+
+
+class HotColdTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.old = Post.objects.create(
+            author=cls.user, group=cls.group, text='Старый пост'
+        )
+        Post.objects.filter(pk=cls.old.pk).update(
+            pub_date=timezone.now() - timedelta(days=400)
+        )
+        Comment.objects.create(post=cls.old, author=cls.user, text='Давно')
+        cls.new = Post.objects.create(
+            author=cls.user, group=cls.group, text='Новый пост'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def archive(self):
+        call_command('archive_posts', days=365, stdout=open('/dev/null', 'w'))
+
+    def test_old_posts_move_to_archive(self):
+        ''' Старые посты с комментариями уходят из горячих таблиц. '''
+        months = MonthlyPostCount.objects.count()
+        self.archive()
+        self.assertEqual(list(Post.objects.all()), [self.new])
+        archived = ArchivedPost.objects.get()
+        self.assertEqual(archived.pk, self.old.pk)
+        self.assertEqual(archived.text, 'Старый пост')
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(ArchivedComment.objects.get().post, archived)
+        self.assertEqual(GroupStats.objects.get().post_count, 2)
+        self.assertEqual(MonthlyPostCount.objects.count(), months)
+
+    def test_archived_posts_stay_searchable(self):
+        ''' Архивный пост находится поиском, и после перестройки индекса. '''
+        self.archive()
+        posts, _ = search_posts('пост')
+        self.assertEqual({post.pk for post in posts},
+                         {self.old.pk, self.new.pk})
+        rebuild_index()
+        posts, _ = search_posts('старый')
+        self.assertEqual([post.pk for post in posts], [self.old.pk])
+        ArchivedPost.objects.get().delete()
+        self.assertEqual(search_posts('старый')[0], [])
+
+    def test_refresh_counts_archived_posts(self):
+        ''' Пересчёт статистики учитывает архив, и удаление архивного
+        поста не уводит счётчик в минус. '''
+        self.archive()
+        refresh_group_stats()
+        self.assertEqual(GroupStats.objects.get().post_count, 2)
+        ArchivedPost.objects.get().delete()
+        self.assertEqual(GroupStats.objects.get().post_count, 1)
+
+    def test_post_detail_reads_archive(self):
+        ''' Страница архивного поста открывается, но без формы. '''
+        self.archive()
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.old.pk])
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.context['post'].text, 'Старый пост')
+        self.assertEqual(
+            [c.text for c in response.context['comments']], ['Давно']
+        )
+        missing = self.client.get(reverse('posts:post_detail', args=[999]))
+        self.assertEqual(missing.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_profile_continues_into_archive(self):
+        ''' Профиль показывает архив после горячих постов. '''
+        self.archive()
+        response = self.client.get(
+            reverse('posts:profile', args=[self.user.username])
+        )
+        self.assertEqual(
+            [post.text for post in response.context['page_obj']],
+            ['Новый пост', 'Старый пост'],
+        )
+        self.assertEqual(response.context['count'], 2)
+
+    def test_hot_cold_slices(self):
+        ''' Срезы на стыке таблиц и целиком в архиве. '''
+        self.archive()
+        posts = HotColdList(Post.objects.all(), ArchivedPost.objects.all())
+        self.assertEqual(len(posts), 2)
+        self.assertEqual([p.pk for p in posts[0:2]],
+                         [self.new.pk, self.old.pk])
+        self.assertEqual([p.pk for p in posts[1:5]], [self.old.pk])
+        self.assertEqual(posts[0], self.new)
+
+    def test_follow_feed_continues_into_archive(self):
+        ''' Лента подписок тоже показывает архив. '''
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.user)
+        self.archive()
+        self.client.force_login(reader)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [post.text for post in response.context['page_obj']],
+            ['Новый пост', 'Старый пост'],
+        )
+
+    def test_export_includes_archive(self):
+        ''' Выгрузка автора содержит архивные посты и комментарии. '''
+        self.archive()
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse('posts:profile_export', args=[self.user.username]),
+            {'format': 'jsonl'},
+        )
+        rows = [
+            json.loads(line) for line in
+            b''.join(response.streaming_content).decode().splitlines()
+        ]
+        self.assertEqual(
+            [(row['type'], row['text']) for row in rows],
+            [('post', 'Старый пост'), ('post', 'Новый пост'),
+             ('comment', 'Давно')],
+        )
+
+    def test_api_pages_continue_into_archive(self):
+        ''' API листает горячие посты, а за ними архив по тому же
+        курсору. '''
+        self.archive()
+        for url in (
+            reverse('api:index'),
+            reverse('api:group_list', args=[self.group.slug]),
+            reverse('api:profile', args=[self.user.username]),
+        ):
+            with self.subTest(url=url):
+                first = self.client.get(url, {'limit': 1}).json()
+                self.assertEqual(
+                    [row['text'] for row in first['results']], ['Новый пост']
+                )
+                second = self.client.get(
+                    url, {'limit': 1, 'cursor': first['next']}
+                ).json()
+                self.assertEqual(
+                    [row['text'] for row in second['results']],
+                    ['Старый пост'],
+                )
+                self.assertIsNone(second['next'])
@@ -0,0 +1,125 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from core.pagecache import fill_holes, hole_marker, register_hole
+
+from ..models import Follow, Group, Post, User
+
+
+@register_hole('echo')
+def echo(request, *args):
+    return '|'.join(args)
+
+
+class SharedPageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Первый пост'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.url = reverse('posts:profile', args=[self.author.username])
+
+    def test_users_share_cached_page(self):
+        ''' Аноним и вошедший читают одну копию, шапка и кнопка — свои. '''
+        anonymous = self.client.get(self.url).content.decode()
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигнала')
+        reader = self.reader_client.get(self.url).content.decode()
+        self.assertIn('Первый пост', reader)
+        self.assertIn('Подписаться', anonymous)
+        self.assertIn('Войти', anonymous)
+        self.assertIn('Отписаться', reader)
+        self.assertIn('Пользователь: reader', reader)
+        self.assertNotIn('<!--hole', reader)
+
+    def test_pinned_request_skips_cached_copy(self):
+        ''' Автор после записи читает не кэш, а primary, и обновляет
+        общую копию. '''
+        self.client.get(self.url)
+        Post.objects.filter(pk=self.post.pk).update(text='Свежий текст')
+        self.assertContains(self.client.get(self.url), 'Первый пост')
+        self.client.cookies[settings.REPLICA_PIN_COOKIE] = '1'
+        self.assertContains(self.client.get(self.url), 'Свежий текст')
+        del self.client.cookies[settings.REPLICA_PIN_COOKIE]
+        self.assertContains(self.client.get(self.url), 'Свежий текст')
+
+    def test_post_changes_drop_group_and_profile(self):
+        ''' Новый пост сразу виден на странице группы и автора. '''
+        group_url = reverse('posts:group_list', args=[self.group.slug])
+        self.client.get(self.url)
+        self.client.get(group_url)
+        Post.objects.create(
+            author=self.author, group=self.group, text='Второй пост'
+        )
+        for url in (self.url, group_url):
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Второй пост')
+
+    def test_recommendations_only_for_owner(self):
+        ''' Рекомендации в профиле видит только его хозяин. '''
+        self.reader_client.get(self.url)
+        with self.assertTemplateNotUsed('posts/includes/who_to_follow.html'):
+            self.reader_client.get(self.url)
+        own = self.reader_client.get(
+            reverse('posts:profile', args=[self.reader.username])
+        )
+        self.assertTemplateUsed(own, 'posts/includes/who_to_follow.html')
+
+    def test_marker_roundtrip(self):
+        ''' Аргументы метки не могут закрыть HTML-комментарий. '''
+        marker = hole_marker('echo', ['a-->b', 'c'])
+        self.assertEqual(marker.count('-->'), 1)
+        request = RequestFactory().get('/')
+        self.assertEqual(
+            fill_holes(request, f'<p>{marker}</p>'), '<p>a-->b|c</p>'
+        )
+
+
+class CachePolicyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_pages_are_public_with_keys(self):
+        ''' Анониму — public с Surrogate-Key страницы. '''
+        pages = {
+            reverse('posts:index'): 'index',
+            reverse('posts:group_list', args=['group']): 'group-group',
+            reverse('posts:profile', args=['author']): 'author-author',
+            reverse('posts:post_detail', args=[self.post.pk]):
+                f'post-{self.post.pk}',
+        }
+        for url, key in pages.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('public', response['Cache-Control'])
+                self.assertIn('s-maxage=600', response['Cache-Control'])
+                self.assertEqual(response['Surrogate-Key'], key)
+
+    def test_logged_in_pages_are_private(self):
+        ''' Страницы вошедшего пользователя прокси не кэширует. '''
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('posts:index'))
+        self.assertIn('private', response['Cache-Control'])
+        self.assertFalse(response.has_header('Surrogate-Key'))
@@ -0,0 +1,66 @@
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Recommendation, StaleRecommendation, User
+from ..recommendations import FollowGraph, rebuild_all, refresh_stale
+
+
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.friend, cls.other, cls.star, cls.new = (
+            User.objects.create_user(username=name)
+            for name in ('reader', 'friend', 'other', 'star', 'new')
+        )
+        Follow.objects.follow(cls.reader.pk, [cls.friend.pk, cls.other.pk])
+        Follow.objects.follow(cls.friend.pk, [cls.star.pk, cls.reader.pk])
+        Follow.objects.follow(cls.other.pk, [cls.star.pk, cls.new.pk])
+
+    def suggestions(self, user):
+        return list(
+            Recommendation.objects.filter(user=user)
+            .order_by('-score', 'author_id')
+            .values_list('author__username', 'score')
+        )
+
+    def test_graph_arrays(self):
+        ''' CSR-граф отдаёт подписки и пустые списки для пропусков. '''
+        graph = FollowGraph([(1, 2), (1, 3), (4, 1)])
+        self.assertEqual(list(graph.following(1)), [2, 3])
+        self.assertEqual(list(graph.following(2)), [])
+        self.assertEqual(list(graph.following(4)), [1])
+        self.assertEqual(list(graph.following(9)), [])
+
+    def test_friends_of_friends(self):
+        ''' Рекомендуются авторы друзей, кроме себя и уже читаемых. '''
+        rebuild_all()
+        self.assertEqual(
+            self.suggestions(self.reader), [('star', 2), ('new', 1)]
+        )
+        self.assertFalse(StaleRecommendation.objects.exists())
+
+    def test_follow_marks_followers_stale(self):
+        ''' Подписка помечает только пользователя, его подписчики
+        пересчитываются вместе с ним. '''
+        rebuild_all()
+        Follow.objects.follow(self.friend.pk, [self.new.pk])
+        self.assertEqual(
+            list(StaleRecommendation.objects.values_list('user', flat=True)),
+            [self.friend.pk],
+        )
+        self.assertEqual(refresh_stale(), 2)
+        self.assertEqual(
+            self.suggestions(self.reader), [('star', 2), ('new', 2)]
+        )
+        self.assertFalse(StaleRecommendation.objects.exists())
+
+    def test_widget_on_follow_page(self):
+        ''' Виджет на ленте подписок читает готовые рекомендации. '''
+        rebuild_all()
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [r.author for r in response.context['recommendations']],
+            [self.star, self.new],
+        )
@@ -0,0 +1,53 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Post
+from ..search import build_match, search_posts
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.posts = Post.objects.bulk_create([
+            Post(author=cls.user, text=f'Котики и собаки {i}')
+            for i in range(5)
+        ] + [Post(author=cls.user, text='Только собаки')])
+
+    def test_build_match_escapes_operators(self):
+        ''' Операторы FTS5 из запроса экранируются кавычками. '''
+        self.assertEqual(build_match('кот OR "пёс'), '"кот" "OR" "пёс"*')
+        self.assertEqual(build_match('  '), '')
+
+    def test_index_follows_inserts_updates_and_deletes(self):
+        ''' Триггеры поддерживают индекс в актуальном состоянии. '''
+        post = Post.objects.create(author=self.user, text='Уникальный енот')
+        self.assertEqual(search_posts('енот')[0], [post])
+        post.text = 'Уникальный барсук'
+        post.save()
+        self.assertEqual(search_posts('енот')[0], [])
+        self.assertEqual(search_posts('барсук')[0], [post])
+        post.delete()
+        self.assertEqual(search_posts('барсук')[0], [])
+
+    def test_keyset_pagination(self):
+        ''' Курсор отдаёт следующую страницу без повторов. '''
+        first, cursor = search_posts('котики', per_page=3)
+        second, last_cursor = search_posts('котики', cursor, per_page=3)
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 2)
+        self.assertIsNone(last_cursor)
+        self.assertFalse(set(first) & set(second))
+
+    def test_search_page(self):
+        ''' Страница поиска доступна и использует свой шаблон. '''
+        response = self.client.get(reverse('posts:search'), {'q': 'собак'})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTemplateUsed(response, 'posts/search.html')
+        self.assertEqual(len(response.context['posts']), 6)
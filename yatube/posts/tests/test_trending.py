@@ -0,0 +1,65 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Post, TrendingPost, User
+from ..trending import trending_posts, update_trending
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.busy, cls.quiet, cls.old = (
+            Post.objects.create(author=cls.user, text=text)
+            for text in ('Обсуждаемый', 'Тихий', 'Вчерашний')
+        )
+
+    def comment(self, post, count, age=timedelta()):
+        for _ in range(count):
+            comment = Comment.objects.create(
+                post=post, author=self.user, text='Комментарий'
+            )
+            Comment.objects.filter(pk=comment.pk).update(
+                created=timezone.now() - age
+            )
+
+    def ranking(self):
+        return list(
+            TrendingPost.objects.order_by('-score')
+            .values_list('post', flat=True)
+        )
+
+    def test_recent_comments_rank_higher(self):
+        ''' Свежие комментарии поднимают пост, старые затухают. '''
+        self.comment(self.busy, 3)
+        self.comment(self.quiet, 1)
+        self.comment(self.old, 5, age=timedelta(days=2))
+        self.assertEqual(update_trending(batch_size=4), 9)
+        self.assertEqual(self.ranking(), [self.busy.pk, self.quiet.pk])
+
+    def test_update_is_incremental(self):
+        ''' Повторный запуск учитывает только новые комментарии. '''
+        self.comment(self.busy, 2)
+        self.comment(self.quiet, 1)
+        update_trending()
+        self.assertEqual(update_trending(), 0)
+        self.comment(self.quiet, 2)
+        self.assertEqual(update_trending(), 2)
+        self.assertEqual(self.ranking(), [self.quiet.pk, self.busy.pk])
+
+    def test_keyset_pages(self):
+        ''' Курсор отдаёт следующую страницу без повторов. '''
+        self.comment(self.busy, 2)
+        self.comment(self.quiet, 1)
+        update_trending()
+        first, cursor = trending_posts(per_page=1)
+        second, last = trending_posts(cursor, per_page=1)
+        self.assertEqual(first + second, [self.busy, self.quiet])
+        self.assertIsNone(last)
+        response = self.client.get(reverse('posts:trending'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.context['posts'], [self.busy, self.quiet])
@@ -1,5 +1,10 @@
+import json
+from http import HTTPStatus
+from unittest import mock
+
+from core.writequeue import WriteQueue
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.test import Client, TestCase, TransactionTestCase
 from django.urls import reverse
 from posts.models import Comment, Follow, Group, Post, User
 from posts.views import PER_PAGE
@@ -213,6 +218,49 @@ class FollowViewsTest(TestCase):
         )
         self.assertEqual(Follow.objects.count(), follow_count - 1)
 
+    def test_follow_is_idempotent(self):
+        ''' Повторная подписка и подписка на себя не создают записей. '''
+        url = reverse('posts:profile_follow', args=[self.author.username])
+        self.authorized_user_fol_client.get(url)
+        self.authorized_user_fol_client.get(url)
+        self.authorized_user_fol_client.get(
+            reverse('posts:profile_follow', args=[self.user_fol.username])
+        )
+        self.assertEqual(
+            Follow.objects.filter(user=self.user_fol).count(), 1
+        )
+
+    def test_bulk_follow_and_unfollow(self):
+        ''' Bulk-подписка принимает список имён и сообщает о ненайденных. '''
+        payload = json.dumps({
+            'usernames': [self.author.username, self.user_unfol.username,
+                          'nobody'],
+        })
+        response = self.authorized_user_fol_client.post(
+            reverse('posts:bulk_follow'), payload,
+            content_type='application/json',
+        )
+        self.assertEqual(response.json(), {
+            'authors': [self.author.username, self.user_unfol.username],
+            'missing': ['nobody'],
+        })
+        self.assertEqual(
+            Follow.objects.filter(user=self.user_fol).count(), 2
+        )
+        self.authorized_user_fol_client.post(
+            reverse('posts:bulk_unfollow'), payload,
+            content_type='application/json',
+        )
+        self.assertFalse(Follow.objects.filter(user=self.user_fol).exists())
+
+    def test_bulk_follow_rejects_bad_payload(self):
+        ''' Некорректное тело запроса даёт 400. '''
+        response = self.authorized_user_fol_client.post(
+            reverse('posts:bulk_follow'), '{"usernames": "test_author"}',
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
     def test_post_appears_in_follow_page_for_followed_author(self):
         ''' Посты автора появляются на странице подписчика. '''
         group = self.group
@@ -380,3 +428,39 @@ class CommentViewsTest(TestCase):
             text=form_data['text'],
         ).exists())
         self.assertEqual(comment_obj.author, self.auth_user)
+
+
+class WriteQueueViewsTest(TransactionTestCase):
+    ''' Комментарии и подписки идут через поток-писатель. '''
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader')
+        self.author = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+        self.client.force_login(self.user)
+        batches = mock.patch.object(
+            WriteQueue, 'write_batch', autospec=True,
+            side_effect=WriteQueue.write_batch,
+        )
+        self.batches = batches.start()
+        self.addCleanup(batches.stop)
+        # Триггер на удаление подписки помечает рекомендации устаревшими:
+        # если flush очистит posts_follow последней, новые пометки
+        # сошлются на уже удалённых пользователей.
+        self.addCleanup(Follow.objects.all().delete)
+
+    def test_add_comment_and_follow_use_writer(self):
+        ''' Запрос отвечает после COMMIT пачки в потоке-писателе. '''
+        self.client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Комментарий'},
+        )
+        self.assertTrue(Comment.objects.filter(
+            post=self.post, author=self.user, text='Комментарий'
+        ).exists())
+        self.client.get(reverse('posts:profile_follow', args=['auth']))
+        self.assertTrue(Follow.objects.filter(
+            user=self.user, author=self.author
+        ).exists())
+        self.assertEqual(self.batches.call_count, 2)
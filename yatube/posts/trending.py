@@ -0,0 +1,111 @@
+import math
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.purge import purge
+
+from .models import Comment, Post, TrendingPost, TrendingState
+from .search import decode_cursor, encode_cursor
+
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+def decay_rate():
+    ''' λ: вклад комментария падает вдвое за TRENDING_HALF_LIFE часов. '''
+    return math.log(2) / (settings.TRENDING_HALF_LIFE * 3600)
+
+
+def log_weight(moment):
+    ''' log exp(λ·t): вклад комментария в момент moment. '''
+    return decay_rate() * (moment - EPOCH).total_seconds()
+
+
+def log_add(first, second):
+    ''' log(e^first + e^second) без переполнения. '''
+    high, low = max(first, second), min(first, second)
+    return high + math.log1p(math.exp(low - high))
+
+
+def apply_comments(rows):
+    ''' Добавляет комментарии [(post_id, created)] к рейтингу. '''
+    deltas = {}
+    for post_id, created in rows:
+        weight = log_weight(created)
+        deltas[post_id] = (
+            log_add(deltas[post_id], weight) if post_id in deltas else weight
+        )
+    existing = dict(
+        TrendingPost.objects.filter(post_id__in=list(deltas))
+        .values_list('post_id', 'score')
+    )
+    TrendingPost.objects.bulk_update(
+        [
+            TrendingPost(post_id=pk, score=log_add(score, deltas[pk]))
+            for pk, score in existing.items()
+        ],
+        ['score'],
+    )
+    alive = Post.objects.filter(
+        pk__in=[post_id for post_id in deltas if post_id not in existing]
+    ).values_list('pk', flat=True)
+    TrendingPost.objects.bulk_create(
+        [TrendingPost(post_id=post_id, score=deltas[post_id])
+         for post_id in alive],
+    )
+
+
+def update_trending(batch_size=None):
+    ''' Досчитывает рейтинг по комментариям после прошлого запуска.
+
+    Каждая пачка и отметка о последнем комментарии пишутся в одной
+    транзакции, поэтому прерванный запуск продолжится без повторов.
+    В конце удаляются посты, чей счёт затух ниже TRENDING_MIN_SCORE.
+    Возвращает число учтённых комментариев.
+    '''
+    batch_size = batch_size or settings.TRENDING_BATCH
+    state, _ = TrendingState.objects.get_or_create(pk=1)
+    processed = 0
+    while True:
+        rows = list(
+            Comment.objects.filter(pk__gt=state.last_comment_id)
+            .order_by('pk')
+            .values_list('pk', 'post_id', 'created')[:batch_size]
+        )
+        if not rows:
+            break
+        with transaction.atomic():
+            apply_comments([(post, created) for _, post, created in rows])
+            state.last_comment_id = rows[-1][0]
+            state.updated = timezone.now()
+            state.save()
+        processed += len(rows)
+    threshold = (
+        log_weight(timezone.now()) + math.log(settings.TRENDING_MIN_SCORE)
+    )
+    expired = TrendingPost.objects.filter(score__lt=threshold).delete()[0]
+    if processed or expired:
+        purge(['trending'])
+    return processed
+
+
+def trending_posts(cursor=None, per_page=10):
+    ''' Страница рейтинга по ключу (score, post_id) и курсор следующей. '''
+    rows = TrendingPost.objects.select_related(
+        'post__author', 'post__group'
+    ).order_by('-score', '-post_id')
+    after = decode_cursor(cursor)
+    if after:
+        score, post_id = after
+        rows = rows.filter(
+            Q(score__lt=score) | Q(score=score, post_id__lt=post_id)
+        )
+    rows = list(rows[:per_page + 1])
+    next_cursor = None
+    if len(rows) > per_page:
+        last = rows[per_page - 1]
+        next_cursor = encode_cursor(last.score, last.post_id)
+    return [row.post for row in rows[:per_page]], next_cursor
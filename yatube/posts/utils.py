@@ -1,4 +1,9 @@
 from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max
+from django.utils.functional import cached_property
+
+ESTIMATE_CAP = 10000
 
 
 def paginator(request, post, per_page: int):
@@ -6,3 +11,44 @@ def paginator(request, post, per_page: int):
     pt = Paginator(post, per_page)
     page_number = request.GET.get('page')
     return pt.get_page(page_number)
+
+
+def analyzed_rows(queryset):
+    ''' Число строк таблицы из sqlite_stat1 (после ANALYZE) или None. '''
+    connection = connections[queryset.db]
+    if connection.vendor != 'sqlite':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+        )
+        if cursor.fetchone() is None:
+            return None
+        cursor.execute(
+            'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    return int(row[0].split()[0]) if row else None
+
+
+class EstimatedCountPaginator(Paginator):
+    ''' Пагинатор без точного COUNT(*) по всей таблице.
+
+    Строки считаются точно, но не больше ESTIMATE_CAP. Дальше для
+    queryset без фильтров берётся оценка из sqlite_stat1, а без ANALYZE —
+    MAX(id); после архивации и удаления MAX(id) завышен, поэтому оценка
+    нужна только там, где точный подсчёт уже дорог. Отфильтрованные
+    выборки останавливаются на ESTIMATE_CAP.
+    '''
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        count = queryset[:ESTIMATE_CAP].count()
+        if count < ESTIMATE_CAP or queryset.query.where:
+            return count
+        estimate = analyzed_rows(queryset)
+        if estimate is None:
+            estimate = queryset.aggregate(estimate=Max('pk'))['estimate']
+        return max(count, estimate or 0)
@@ -1,72 +1,257 @@
+import json
+
 from django.contrib.auth.decorators import login_required
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.utils.formats import date_format
+from django.views.decorators.http import require_POST
+
+from core.pagecache import cache_policy, shared_cache_page
+from core.writequeue import write
+from users.cache import get_user_or_404
 
+from .archive import archive_nav, month_range
+from .exports import EXPORT_FORMATS, export_author
 from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post, User
+from .hotcold import HotColdList
+from .models import (ArchivedPost, Follow, Group, MonthlyPostCount, Post,
+                     User)
+from .recommendations import recommendations_for
+from .search import search_posts
+from .tasks import make_thumbnails
+from .trending import trending_posts
 from .utils import paginator
 
 PER_PAGE = 10
+GROUPS_PER_PAGE = 20
+BULK_FOLLOW_LIMIT = 100
+PAGE_CACHE_TIMEOUT = 300
+
+
+def group_keys(slug, **kwargs):
+    ''' Ключи страниц группы: теги общего кэша и Surrogate-Key. '''
+    return [f'group-{slug}']
 
 
-@cache_page(20, key_prefix='index_page')
+def author_keys(username, **kwargs):
+    return [f'author-{username}']
+
+
+@cache_policy(20, keys=lambda: ['index'])
+@shared_cache_page(20, key_prefix='index_page')
 def index(request):
     ''' Главная страница. '''
     template = 'posts/index.html'
     title = 'Последние обновления на сайте'
-    posts = Post.objects.select_related('author', 'group')
+    posts = HotColdList(
+        Post.objects.select_related('author', 'group'),
+        ArchivedPost.objects.select_related('author', 'group'),
+    )
     page_obj = paginator(request, posts, PER_PAGE)
     context = {
         'title': title,
         'page_obj': page_obj,
+        'archive': archive_nav(MonthlyPostCount.SITE, 0, 'posts:archive'),
     }
     return render(request, template, context)
 
 
+@cache_policy(60, keys=group_keys)
+@shared_cache_page(
+    PAGE_CACHE_TIMEOUT, key_prefix='group_list', tags=group_keys
+)
 def group_posts(request, slug):
     ''' Страница группы. '''
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
     title = Group.__str__
-    posts = group.posts.select_related('author')
+    posts = HotColdList(
+        group.posts.select_related('author'),
+        group.archived_posts.select_related('author'),
+    )
     page_obj = paginator(request, posts, PER_PAGE)
     context = {
         'title': title,
         'group': group,
         'page_obj': page_obj,
+        'archive': archive_nav(
+            MonthlyPostCount.GROUP, group.pk, 'posts:group_archive', slug
+        ),
     }
     return render(request, template, context)
 
 
+@cache_policy(60, keys=lambda: ['groups'])
+@shared_cache_page(60, key_prefix='group_index')
+def group_index(request):
+    ''' Каталог групп со счётчиками из GroupStats. '''
+    template = 'posts/group_index.html'
+    groups = Group.objects.select_related('stats').order_by('title', 'pk')
+    page_obj = paginator(request, groups, GROUPS_PER_PAGE)
+    context = {
+        'title': 'Группы',
+        'page_obj': page_obj,
+    }
+    return render(request, template, context)
+
+
+@cache_policy(60, keys=author_keys)
+@shared_cache_page(
+    PAGE_CACHE_TIMEOUT, key_prefix='profile', tags=author_keys
+)
 def profile(request, username):
     ''' Страница всех постов автора. '''
     template = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.select_related('author', 'group')
-    count = author.posts.count()
+    author = get_user_or_404(username)
+    posts = HotColdList(
+        author.posts.select_related('author', 'group'),
+        author.archived_posts.select_related('author', 'group'),
+    )
     page_obj = paginator(request, posts, PER_PAGE)
-    following = author.following.filter(user__id=request.user.id).exists()
+    count = page_obj.paginator.count
     context = {
         'author': author,
         'count': count,
         'page_obj': page_obj,
-        'following': following,
+        'archive': archive_nav(
+            MonthlyPostCount.AUTHOR, author.pk, 'posts:profile_archive',
+            username,
+        ),
+    }
+    return render(request, template, context)
+
+
+@cache_policy(60, keys=lambda: ['trending'])
+def trending(request):
+    ''' Посты, которые сейчас активно комментируют. '''
+    template = 'posts/trending.html'
+    posts, next_cursor = trending_posts(request.GET.get('after'), PER_PAGE)
+    context = {
+        'title': 'Популярное',
+        'posts': posts,
+        'next_cursor': next_cursor,
     }
     return render(request, template, context)
 
 
+@login_required
+def profile_export(request, username):
+    ''' Потоковая выгрузка постов и комментариев автора. '''
+    if request.user.username != username and not request.user.is_staff:
+        return redirect('posts:profile', username=username)
+    author = get_user_or_404(username)
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        fmt = 'csv'
+    response = StreamingHttpResponse(
+        export_author(author, fmt),
+        content_type=EXPORT_FORMATS[fmt][1],
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{username}.{fmt}"'
+    )
+    return response
+
+
+@cache_policy(60, keys=lambda post_id: [f'post-{post_id}'])
 def post_detail(request, post_id):
     ''' Страница детальной информации поста. '''
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
-    form = CommentForm(add_comment(request, post_id))
-    comments = Comment.objects.filter(post=post_id)
-    count = Post.objects.select_related('author').count()
+    try:
+        post = Post.objects.get_or_archived(pk=post_id)
+    except ArchivedPost.DoesNotExist:
+        raise Http404('Пост не найден')
     context = {
         'post': post,
-        'form': form,
-        'comments': comments,
-        'count': count,
+        'form': CommentForm(),
+        'comments': post.comments.select_related('author'),
+    }
+    return render(request, template, context)
+
+
+def archive_page(request, posts, year, month, title, archive):
+    ''' Посты за месяц: range scan по pub_date, без функций над датой.
+
+    posts — пара (горячие, архивные) выборок.
+    '''
+    try:
+        start, end = month_range(year, month)
+    except ValueError:
+        raise Http404('Нет такого месяца')
+    posts = HotColdList(*(
+        queryset.filter(pub_date__gte=start, pub_date__lt=end)
+        for queryset in posts
+    ))
+    page_obj = paginator(request, posts, PER_PAGE)
+    context = {
+        'title': f'{title}: {date_format(start, "F Y")}',
+        'page_obj': page_obj,
+        'archive': archive,
+    }
+    return render(request, 'posts/archive.html', context)
+
+
+@cache_policy(300, keys=lambda **kwargs: ['index'])
+def archive(request, year, month):
+    ''' Архив сайта за месяц. '''
+    return archive_page(
+        request,
+        (
+            Post.objects.select_related('author', 'group'),
+            ArchivedPost.objects.select_related('author', 'group'),
+        ),
+        year, month, 'Архив',
+        archive_nav(MonthlyPostCount.SITE, 0, 'posts:archive'),
+    )
+
+
+@cache_policy(300, keys=group_keys)
+def group_archive(request, slug, year, month):
+    ''' Архив группы за месяц. '''
+    group = get_object_or_404(Group, slug=slug)
+    return archive_page(
+        request,
+        (
+            group.posts.select_related('author', 'group'),
+            group.archived_posts.select_related('author', 'group'),
+        ),
+        year, month, group.title,
+        archive_nav(
+            MonthlyPostCount.GROUP, group.pk, 'posts:group_archive', slug
+        ),
+    )
+
+
+@cache_policy(300, keys=author_keys)
+def profile_archive(request, username, year, month):
+    ''' Архив автора за месяц. '''
+    author = get_user_or_404(username)
+    return archive_page(
+        request,
+        (
+            author.posts.select_related('author', 'group'),
+            author.archived_posts.select_related('author', 'group'),
+        ),
+        year, month, f'Записи {username}',
+        archive_nav(
+            MonthlyPostCount.AUTHOR, author.pk, 'posts:profile_archive',
+            username,
+        ),
+    )
+
+
+def search(request):
+    ''' Полнотекстовый поиск по постам. '''
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    posts, next_cursor = search_posts(
+        query, request.GET.get('after'), PER_PAGE
+    )
+    context = {
+        'title': 'Поиск',
+        'query': query,
+        'posts': posts,
+        'next_cursor': next_cursor,
     }
     return render(request, template, context)
 
@@ -83,6 +268,8 @@ def create_post(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        if post.image:
+            make_thumbnails.delay(post.pk)
         return redirect('posts:profile', username=request.user)
     return render(request, template, {'form': form})
 
@@ -99,7 +286,9 @@ def post_edit(request, post_id):
         instance=post
     )
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data and post.image:
+            make_thumbnails.delay(post.pk)
         return redirect('posts:post_detail', post_id)
     context = {'form': form, 'is_edit': True, 'post': post}
     return render(request, 'posts/create_post.html', context)
@@ -114,7 +303,7 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        write(comment.save)
     return redirect('posts:post_detail', post_id=post_id)
 
 
@@ -123,11 +312,19 @@ def follow_index(request):
     ''' Главная страница избранных авторов. '''
     template = 'posts/follow.html'
     title = 'Посты авторов, на которые подписаны'
-    posts = Post.objects.filter(author__following__user=request.user)
+    posts = HotColdList(
+        Post.objects.filter(
+            author__following__user=request.user
+        ).select_related('author', 'group'),
+        ArchivedPost.objects.filter(
+            author__following__user=request.user
+        ).select_related('author', 'group'),
+    )
     page_obj = paginator(request, posts, PER_PAGE)
     context = {
         'title': title,
         'page_obj': page_obj,
+        'recommendations': recommendations_for(request.user),
     }
     return render(request, template, context)
 
@@ -135,25 +332,59 @@ def follow_index(request):
 @login_required
 def profile_follow(request, username):
     ''' Функция подписки на автора. '''
-    follower = Follow.objects.filter(
-        user=request.user,
-        author=get_object_or_404(User, username=username)
-    ).exists()
-    if request.user.username != username and not follower:
-        Follow.objects.create(
-            user=request.user,
-            author=get_object_or_404(User, username=username),
-        )
+    author = get_user_or_404(username)
+    write(Follow.objects.follow, request.user.pk, [author.pk])
     return redirect('posts:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
     ''' Функция отписки от автора. '''
-    follower = Follow.objects.filter(
-        user=request.user,
-        author=get_object_or_404(User, username=username)
-    )
-    if follower:
-        follower.delete()
+    author = get_user_or_404(username)
+    write(Follow.objects.unfollow, request.user.pk, [author.pk])
     return redirect('posts:profile', username=username)
+
+
+def bulk_usernames(request):
+    ''' Список имён из тела запроса {"usernames": [...]}. '''
+    try:
+        usernames = json.loads(request.body)['usernames']
+    except (ValueError, KeyError, TypeError):
+        raise ValueError('Ожидается JSON вида {"usernames": [...]}')
+    if not isinstance(usernames, list) or not all(
+        isinstance(name, str) for name in usernames
+    ):
+        raise ValueError('usernames должен быть списком строк')
+    if len(usernames) > BULK_FOLLOW_LIMIT:
+        raise ValueError(f'Не больше {BULK_FOLLOW_LIMIT} авторов за раз')
+    return set(usernames)
+
+
+def bulk_follow_response(request, action):
+    try:
+        usernames = bulk_usernames(request)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    authors = dict(
+        User.objects.filter(username__in=usernames)
+        .values_list('username', 'pk')
+    )
+    write(action, request.user.pk, list(authors.values()))
+    return JsonResponse({
+        'authors': sorted(authors),
+        'missing': sorted(usernames - authors.keys()),
+    })
+
+
+@require_POST
+@login_required
+def bulk_follow(request):
+    ''' Подписка на список авторов одним запросом. '''
+    return bulk_follow_response(request, Follow.objects.follow)
+
+
+@require_POST
+@login_required
+def bulk_unfollow(request):
+    ''' Отписка от списка авторов одним запросом. '''
+    return bulk_follow_response(request, Follow.objects.unfollow)
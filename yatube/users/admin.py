@@ -0,0 +1,14 @@
+from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+
+from posts.admin import BackgroundDeleteAdmin
+from posts.tasks import schedule_user_deletion
+
+from .cache import User
+
+admin.site.unregister(User)
+
+
+@admin.register(User)
+class UserAdmin(BackgroundDeleteAdmin, BaseUserAdmin):
+    schedule_deletion = staticmethod(schedule_user_deletion)
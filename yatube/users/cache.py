@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.http import Http404
+from django.utils.crypto import constant_time_compare
+
+User = get_user_model()
+
+USER_KEY = 'users:id:{}'
+USERNAME_KEY = 'users:name:{}'
+
+
+def user_cache():
+    ''' Кэш USER_CACHE_ALIAS. Он обязан быть общим для всех воркеров
+    (проверка users.E001): иначе сброс после смены пароля или
+    отключения пользователя не дойдёт до соседних процессов. '''
+    return caches[settings.USER_CACHE_ALIAS]
+
+
+def cache_user(user):
+    user_cache().set_many({
+        USER_KEY.format(user.pk): user,
+        USERNAME_KEY.format(user.username): user.pk,
+    }, settings.USER_CACHE_TIMEOUT)
+
+
+def invalidate_user(user):
+    user_cache().delete_many((
+        USER_KEY.format(user.pk),
+        USERNAME_KEY.format(user.username),
+    ))
+
+
+def get_user(request):
+    ''' То же, что django.contrib.auth.get_user, но через кэш по id.
+
+    Хэш сессии и is_active сверяются с закэшированным пользователем
+    на каждом запросе; после смены пароля запись сбрасывается
+    сигналом, так что старые сессии не переживут её и из кэша.
+    '''
+    try:
+        user_id = User._meta.pk.to_python(request.session[auth.SESSION_KEY])
+        backend_path = request.session[auth.BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    if backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return auth.get_user(request)
+    user = user_cache().get(USER_KEY.format(user_id))
+    if user is not None and user.is_active:
+        session_hash = request.session.get(auth.HASH_SESSION_KEY)
+        if session_hash and constant_time_compare(
+            session_hash, user.get_session_auth_hash()
+        ):
+            user.backend = backend_path
+            return user
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        cache_user(user)
+    return user
+
+
+def get_user_or_404(username):
+    ''' Пользователь по username из кэша, иначе из базы. '''
+    cache = user_cache()
+    pk = cache.get(USERNAME_KEY.format(username))
+    if pk is not None:
+        user = cache.get(USER_KEY.format(pk))
+        if user is not None and user.username == username:
+            return user
+    user = User.objects.filter(username=username).first()
+    if user is None:
+        raise Http404('Пользователь не найден')
+    cache_user(user)
+    return user
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, register
+
+
+@register()
+def user_cache_is_shared(app_configs, **kwargs):
+    ''' Кэш пользователей в памяти процесса не видит сбросов из других
+    воркеров: отключённый пользователь остался бы в системе. '''
+    if isinstance(caches[settings.USER_CACHE_ALIAS], LocMemCache):
+        return [Error(
+            f'USER_CACHE_ALIAS={settings.USER_CACHE_ALIAS!r} указывает '
+            'на LocMemCache.',
+            hint='Нужен общий для воркеров кэш: файловый, memcached, '
+                 'база данных.',
+            id='users.E001',
+        )]
+    return []
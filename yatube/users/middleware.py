@@ -0,0 +1,11 @@
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.utils.functional import SimpleLazyObject
+
+from .cache import get_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    ''' request.user берётся из кэша пользователей, а не из таблицы. '''
+
+    def process_request(self, request):
+        request.user = SimpleLazyObject(lambda: get_user(request))
@@ -0,0 +1,9 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import User, invalidate_user
+
+
+@receiver((post_save, post_delete), sender=User)
+def drop_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance)
@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.checks import run_checks
+from django.http import Http404
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..cache import get_user_or_404, user_cache
+
+User = get_user_model()
+
+
+class UserCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='auth', password='test_pass'
+        )
+
+    def setUp(self):
+        user_cache().clear()
+        self.client = Client()
+        self.client.login(username='auth', password='test_pass')
+
+    def test_authenticated_requests_skip_users_table(self):
+        ''' Повторный запрос берёт request.user из кэша. '''
+        url = reverse('about:author')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_password_change_drops_cached_sessions(self):
+        ''' После смены пароля старая сессия не проходит и через кэш. '''
+        self.client.get(reverse('about:author'))
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password('new_pass')
+        user.save()
+        response = self.client.get(reverse('about:author'))
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def test_username_lookup(self):
+        ''' Поиск по username кэшируется и учитывает переименование. '''
+        self.assertEqual(get_user_or_404('auth'), self.user)
+        with self.assertNumQueries(0):
+            get_user_or_404('auth')
+        User.objects.filter(pk=self.user.pk).update(username='renamed')
+        user = User.objects.get(pk=self.user.pk)
+        user.save()
+        with self.assertRaises(Http404):
+            get_user_or_404('auth')
+        self.assertEqual(get_user_or_404('renamed'), self.user)
+
+    def test_inactive_cached_user_is_logged_out(self):
+        ''' Закэшированный отключённый пользователь не проходит. '''
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        get_user_or_404('auth')
+        response = self.client.get(reverse('about:author'))
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def test_process_local_cache_is_rejected(self):
+        ''' Кэш пользователей в памяти процесса — ошибка проверки. '''
+        with override_settings(CACHES={
+            **settings.CACHES,
+            'users': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            },
+        }):
+            errors = [error.id for error in run_checks()]
+        self.assertIn('users.E001', errors)
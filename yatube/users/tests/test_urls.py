@@ -1,7 +1,9 @@
 from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
+
+from core.models import OutboxMessage
 
 User = get_user_model()
 
@@ -71,3 +73,13 @@ class ContactURLTests(TestCase):
             with self.subTest(address=address):
                 response = self.authorized_client.get(address)
                 self.assertTemplateUsed(response, template)
+
+    @override_settings(EMAIL_BACKEND='core.mail.OutboxBackend')
+    def test_password_reset_email_goes_to_outbox(self):
+        ''' Письмо сброса пароля складывается в outbox, а не отправляется. '''
+        self.guest_client.post(
+            '/auth/password_reset/', {'email': 'test@yandex.ru'}
+        )
+        message = OutboxMessage.objects.get()
+        self.assertIn('test@yandex.ru', message.recipients)
+        self.assertEqual(message.status, OutboxMessage.PENDING)
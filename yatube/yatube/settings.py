@@ -46,6 +46,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail'
 ]
 
@@ -54,9 +55,11 @@ MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'users.middleware.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.RateLimitMiddleware',
+    'core.middleware.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -66,8 +69,15 @@ LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма складываются в outbox и уходят командой flush_outbox
+# через OUTBOX_EMAIL_BACKEND.
+EMAIL_BACKEND = 'core.mail.OutboxBackend'
+OUTBOX_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_RATE = 10
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_DELAY = 60
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
@@ -97,7 +107,142 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    },
+    'thumbnails': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'thumbnails.sqlite3'),
+    },
+    'cache': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'cache.sqlite3'),
+    },
+    # Копия default, которую обновляет refresh_replica.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'replica.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+# Горячие служебные таблицы живут в отдельных файлах SQLite со своей
+# блокировкой записи (core.routers). Ключ — app_label, значение — база.
+# Сессии в базу не пишутся вовсе: см. SESSION_BACKING_ENGINE.
+DATABASE_APPS_MAPPING = {
+    'thumbnail': 'thumbnails',
+    'django_cache': 'cache',
+}
+DATABASE_ROUTERS = [
+    'core.routers.AppDatabaseRouter',
+    'core.routers.ReplicaRouter',
+]
+
+# Страницы, которые читают с реплики (core.middleware.ReplicaMiddleware).
+# После записи и после REPLICA_PIN_VIEWS (записи через GET) клиент
+# REPLICA_PIN_SECONDS секунд читает из primary. Пока refresh_replica не
+# скопировал базу с нынешней схемой, чтения тоже идут в primary.
+REPLICA_DATABASE = 'replica'
+REPLICA_VIEWS = (
+    'posts:index',
+    'posts:group_index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:trending',
+    'posts:archive',
+    'posts:group_archive',
+    'posts:profile_archive',
+)
+REPLICA_PIN_VIEWS = (
+    'posts:profile_follow',
+    'posts:profile_unfollow',
+)
+REPLICA_PIN_COOKIE = 'primary_pin'
+# Период refresh_replica --loop. Закрепление переживает его вместе со
+# временем копирования, иначе автор мог бы не увидеть свою запись.
+REPLICA_REFRESH_INTERVAL = 30
+REPLICA_PIN_SECONDS = 2 * REPLICA_REFRESH_INTERVAL
+REPLICA_COPY_PAGES = 1024
+REPLICA_COPY_SLEEP = 0.005
+# После стольких перезапусков копирования порциями (core.db.copy_database)
+# база копируется одним шагом, иначе занятая база не скопируется никогда.
+DB_COPY_MAX_RESTARTS = 3
+
+# Поток-писатель (core.writequeue) собирает мелкие записи в пачки
+# до WRITE_QUEUE_BATCH, дожидаясь следующей не дольше WRITE_QUEUE_LINGER.
+# Его соединение ждёт fsync на каждом COMMIT (WRITE_QUEUE_SYNCHRONOUS),
+# поэтому ответ на запрос уходит только после надёжной записи.
+WRITE_QUEUE_ENABLED = True
+WRITE_QUEUE_SYNCHRONOUS = 'full'
+WRITE_QUEUE_BATCH = 64
+WRITE_QUEUE_LINGER = 0.002
+WRITE_QUEUE_TIMEOUT = 30
+
+# Снимки базы командой backup_db: по BACKUP_PAGES страниц с паузой
+# BACKUP_SLEEP, чтобы писатели не ждали всё время копирования.
+BACKUP_DIR = os.path.join(BASE_DIR, 'backups')
+BACKUP_PAGES = 256
+BACKUP_SLEEP = 0.05
+BACKUP_KEEP = 7
+BACKUP_COMPRESSLEVEL = 6
+
+# «Кого читать» (posts.recommendations): build_recommendations хранит
+# RECOMMENDATIONS_TOP авторов на пользователя, виджет показывает SHOWN.
+RECOMMENDATIONS_TOP = 20
+RECOMMENDATIONS_SHOWN = 5
+RECOMMENDATIONS_CHUNK = 1000
+
+# «Популярное» (posts.trending): вклад комментария падает вдвое за
+# TRENDING_HALF_LIFE часов; посты со счётом ниже MIN_SCORE выбывают.
+TRENDING_HALF_LIFE = 6
+TRENDING_MIN_SCORE = 0.05
+TRENDING_BATCH = 5000
+
+# Посты старше ARCHIVE_AFTER_DAYS дней archive_posts переносит
+# в архивные таблицы (posts.hotcold).
+ARCHIVE_AFTER_DAYS = 365
+ARCHIVE_BATCH = 500
+
+# Удаление пользователей и групп из админки (posts.deletion): фоновая
+# задача удаляет связанные строки пачками по DELETION_BATCH с паузой
+# DELETION_PAUSE секунд, чтобы не держать блокировку записи.
+DELETION_BATCH = 200
+DELETION_PAUSE = 0.05
+
+# Лимиты частоты запросов (core.ratelimit) по имени URL: ведро
+# пользователя и ведро IP вида (ёмкость, секунд на полное наполнение).
+# Вёдра и счётчики живут в кэше RATELIMIT_CACHE, без него — в памяти
+# процесса.
+RATELIMIT_ENABLED = True
+RATELIMIT_CACHE = 'default'
+# За обратным прокси REMOTE_ADDR — адрес прокси. Адрес клиента тогда
+# берётся из заголовка RATELIMIT_PROXY_HEADER (ключ request.META, например
+# 'HTTP_X_FORWARDED_FOR'), RATELIMIT_PROXY_COUNT — число доверенных
+# прокси перед приложением; 0 — прокси нет.
+RATELIMIT_PROXY_HEADER = 'HTTP_X_FORWARDED_FOR'
+RATELIMIT_PROXY_COUNT = 0
+RATELIMITS = {
+    'posts:post_create': {'user': (5, 60), 'ip': (20, 60)},
+    'posts:post_edit': {'user': (10, 60), 'ip': (30, 60)},
+    'posts:add_comment': {'user': (10, 60), 'ip': (30, 60)},
+    'posts:profile_follow': {
+        'methods': ('GET', 'POST'), 'user': (30, 60), 'ip': (60, 60),
+    },
+    'posts:profile_unfollow': {
+        'methods': ('GET', 'POST'), 'user': (30, 60), 'ip': (60, 60),
+    },
+    'posts:bulk_follow': {'user': (5, 60), 'ip': (10, 60)},
+    'posts:bulk_unfollow': {'user': (5, 60), 'ip': (10, 60)},
+}
+
+# PRAGMA для каждого соединения SQLite (core.db). WAL разводит читателей
+# и писателя, busy_timeout ждёт блокировку вместо "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'cache_size': -64000,
+    'mmap_size': 268435456,
+    'temp_store': 'memory',
 }
 
 
@@ -146,8 +291,72 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Тесты переносят файловые кэши из BASE_DIR/cache во временный каталог.
+TEST_RUNNER = 'core.runner.TempCacheRunner'
+
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    # Кэши сессий и пользователей общие для всех воркеров хоста;
+    # на нескольких хостах — memcached.
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'sessions'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'users': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'users'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
 }
+
+# Сессии: кэш SESSION_CACHE_ALIAS перед отдельным хранилищем
+# SESSION_BACKING_ENGINE, без чтений и записей в основную базу. Кэш
+# общий для воркеров (проверка core.E001).
+SESSION_ENGINE = 'core.sessions'
+SESSION_CACHE_ALIAS = 'sessions'
+SESSION_CACHE_TIMEOUT = 30
+SESSION_BACKING_ENGINE = 'django.contrib.sessions.backends.file'
+
+# Общий для всех посетителей кэш страниц (core.pagecache): личные
+# куски страниц подставляются на каждый запрос через {% hole %}.
+PAGE_CACHE_ALIAS = 'default'
+
+# Обратный прокси или CDN (core.purge): анонимные страницы отдаются
+# с Cache-Control: public и Surrogate-Key, а изменения постов,
+# комментариев и подписок рассылают CACHE_PURGE_METHOD (PURGE или BAN)
+# с ключами в заголовке CACHE_PURGE_HEADER на каждый CACHE_PURGE_URLS.
+CACHE_SURROGATE_MAX_AGE = 600
+CACHE_PURGE_URLS = []
+CACHE_PURGE_METHOD = 'PURGE'
+CACHE_PURGE_HEADER = 'Surrogate-Key'
+CACHE_PURGE_TIMEOUT = 2
+
+# Пользователи по id и username кэшируются в USER_CACHE_ALIAS и
+# сбрасываются при сохранении или удалении User. Кэш должен быть общим
+# для всех воркеров, LocMemCache отвергает проверка users.E001.
+USER_CACHE_ALIAS = 'users'
+USER_CACHE_TIMEOUT = 300
+
+# Фоновые задачи (core.queue). В режиме TASKS_EAGER задачи
+# выполняются сразу при постановке в очередь, без run_workers.
+TASKS_EAGER = False
+TASKS_MAX_ATTEMPTS = 5
+TASKS_RETRY_DELAY = 10
+TASKS_RETRY_MAX_DELAY = 3600
+# Аренда захваченной задачи, секунд: если воркер умер, не доделав её,
+# по истечении аренды задачу снова заберёт claim().
+TASKS_LEASE = 600
+
+# Прогрев воркера (core.warmup, команда warmup, YATUBE_WARMUP=1 в WSGI).
+WARMUP_IMPORTS = (
+    'PIL.Image',
+    'sorl.thumbnail.base',
+    'sorl.thumbnail.engines.pil_engine',
+    'django.contrib.admin.sites',
+)
+WARMUP_URLS = ('posts:index',)
+WARMUP_GROUPS = 20
+WARMUP_HOST = 'localhost'
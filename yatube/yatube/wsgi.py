@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# При предзагрузке (gunicorn --preload) воркеры стартуют прогретыми.
+if os.environ.get('YATUBE_WARMUP'):
+    from core.warmup import warmup
+
+    warmup()